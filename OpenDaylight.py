@@ -26,9 +26,32 @@ under Grant No.  1247322.
 """
 
 from __future__ import print_function
+import array
+import base64
+import bisect
+import codecs
+import gzip
+import hashlib
 import json
-import requests
-from requests.auth import HTTPBasicAuth
+import math
+import random
+import re
+import select
+import socket
+import sys
+import threading
+import time
+from collections import OrderedDict, deque, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+try:
+    import http.client as httplib
+    from urllib.parse import urlsplit
+except ImportError:
+    import httplib
+    from urlparse import urlsplit
+# Requests is imported by OpenDaylightRequestsTransport when one is built,
+# so that scripts using the 'http.client' transport never pay for it; NumPy,
+# if there is one, is likewise only imported by OpenDaylightPortSampler
 
 class OpenDaylight(object):
     """An object holding details to talk to the OpenDaylight REST API
@@ -41,15 +64,80 @@ class OpenDaylight(object):
            'password':'admin',
            'path':'/controller/nb/v2/',
            'container':'default',
-           'http':'http://' }
+           'http':'http://',
+           'pool_size':10,
+           'timeout':None,
+           'retries':0,
+           'retry_backoff':0.1,
+           'hedge_percentile':None,
+           'hedge_budget':0.1,
+           'coalesce_reads':False,
+           'transport':'requests' }
 
        Your code should change these as required for your installation.
        OpenDaylight.url holds the url for each REST query.  Typically
        you would let OpenDaylight.prepare() build this for you.
 
-       OpenDaylight.auth holds an auth object for Requests to use 
+       OpenDaylight.auth holds an auth object for the transport to use 
        for each REST query.  Typically you would also let 
        OpenDaylight.prepare() build this for you.
+
+       OpenDaylight.transport sends the REST queries, over a pool of
+       keep-alive connections to the controller shared by every
+       OpenDaylightFlow and OpenDaylightNode bound to this object.  It is
+       built on first use, as setup['transport'] says, with room for
+       setup['pool_size'] connections, so change those before making any
+       calls:
+          'requests'    - OpenDaylightRequestsTransport, the default
+          'http.client' - OpenDaylightStdlibTransport, which needs nothing
+                          beyond the standard library and starts up and
+                          sends each query more cheaply
+       or any callable that takes the pool size and returns an object with
+       the same methods.  Call OpenDaylight.close() when you are done with
+       it, and OpenDaylight.pool_stats() to see how well the connections
+       are being reused.  With the 'requests' transport,
+       OpenDaylight.session is its Requests session.
+
+       Every REST query goes through OpenDaylight.send(), which applies
+       the remaining setup values:
+          'timeout'          - seconds a call may take in all, including
+                               any retries, or None to wait forever.  Most
+                               calls also take a timeout argument to
+                               override this.
+          'retries'          - how many more times to try a GET or DELETE
+                               that got no response or a 502, 503 or 504.
+                               A POST is never retried, since the Controller
+                               may have acted on it already.
+          'retry_backoff'    - base seconds to wait before a retry.  Each
+                               wait is random, up to retry_backoff doubled
+                               for every earlier attempt.
+          'hedge_percentile' - when set, say to 95, a GET that has taken
+                               longer than 95% of recent GETs gets a
+                               duplicate sent alongside it, and whichever
+                               answers first wins.  The first GET is sent
+                               from the calling thread, and the clock only
+                               starts once it has been.  This needs a
+                               transport with interrupt(), as both of the
+                               built in ones have.
+          'hedge_budget'     - most duplicates to send, as a fraction of
+                               the GETs sent with hedging on, so that a
+                               Controller that is slow because it is busy
+                               isn't sent twice the work.
+          'coalesce_reads'   - when True, a plain GET for a url that is
+                               already being fetched with the same
+                               credentials doesn't send its own query, but
+                               waits for that one and gets the same
+                               response.  OpenDaylight.coalesced counts the
+                               calls answered that way.
+
+       OpenDaylight.instrumentation may be set to an
+       OpenDaylightInstrumentation object to record every call made through
+       send().  It is None by default, which costs next to nothing.
+
+       OpenDaylight.limiter may likewise be set to an OpenDaylightLimiter
+       to cap how many queries are in flight to the Controller at once,
+       adapting the cap to how the Controller is coping.  Several
+       OpenDaylight objects for one Controller can share a limiter.
     """
 
     def __init__(self):
@@ -61,11 +149,323 @@ class OpenDaylight(object):
                       'password':'admin',
                       'path':'/controller/nb/v2/',
                       'container':'default',
-                      'http':'http://'}
+                      'http':'http://',
+                      'pool_size':10,
+                      'timeout':None,
+                      'retries':0,
+                      'retry_backoff':0.1,
+                      'hedge_percentile':None,
+                      'hedge_budget':0.1,
+                      'coalesce_reads':False,
+                      'transport':'requests'}
 
         self._base_url = None
         self.url = None 
         self.auth = None
+        self._transport = None
+        self._session_lock = threading.Lock()
+        self._hedge_executor = None
+        self._hedge_lock = threading.Lock()
+        self._hedged_gets = 0
+        self._hedges = 0
+        self._get_latencies = deque(maxlen=256)
+        self.instrumentation = None
+        self.limiter = None
+        self.coalesced = 0
+        self._flights = {}
+        self._flights_lock = threading.Lock()
+
+    @property
+    def transport(self):
+        """The transport used for every REST query, built the first time
+           it is needed.
+        """
+        if self._transport is None:
+            with self._session_lock:
+                if self._transport is None:
+                    factory = self.setup['transport']
+                    if not callable(factory):
+                        factory = _TRANSPORTS[factory]
+                    self._transport = factory(self.setup['pool_size'])
+        return self._transport
+
+    @property
+    def session(self):
+        """The Requests session of the 'requests' transport.
+        """
+        return self.transport.session
+
+    def close(self):
+        """Close every pooled connection to the controller.  The next REST
+           query will build a fresh transport.
+        """
+        with self._session_lock:
+            if self._transport is not None:
+                self._transport.close()
+                self._transport = None
+            if self._hedge_executor is not None:
+                self._hedge_executor.shutdown(wait=False)
+                self._hedge_executor = None
+
+    def send(self, method, url, auth, timeout=None, app=None, op=None,
+             **kwargs):
+        """Send one REST query over OpenDaylight.transport and return the
+           response, applying the timeout, retry and hedging settings
+           described above.  Extra keyword arguments go to the transport;
+           both transports take data, headers and stream, as Requests does.
+
+           Arguments:
+            'method'  - http verb to use
+            'url'     - as built by prepare_url() or build_url()
+            'auth'    - as built by prepare_auth() or build_auth()
+            'timeout' - seconds this call may take, overriding
+                        setup['timeout']
+            'app'     - the northbound application, for instrumentation
+            'op'      - what the call is for, such as 'add', for
+                        instrumentation
+
+           If the time runs out the transport's Timeout is raised
+           (requests.exceptions.Timeout, or socket.timeout for
+           'http.client'), and if every attempt fails to connect the last
+           exception is raised.
+        """
+        if method == 'GET' and not kwargs and self.setup['coalesce_reads']:
+            return self._send_coalesced(url, auth, timeout, app, op)
+        return self._send_measured(method, url, auth, timeout, app, op,
+                                   kwargs)
+
+    def _send_measured(self, method, url, auth, timeout, app, op, kwargs):
+        """send() without the coalescing.
+        """
+        if self.instrumentation is None:
+            return self._send(method, url, auth, timeout, kwargs)
+        return self.instrumentation.measure(self._send, app, op, method, url,
+                                            auth, timeout, kwargs)
+
+    def _send_coalesced(self, url, auth, timeout, app, op):
+        """GET url, unless the same GET is already in flight, in which case
+           wait for its response instead.
+        """
+        key = (url, _auth_key(auth))
+        with self._flights_lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = {'done':threading.Event(), 'response':None,
+                          'error':None}
+                self._flights[key] = flight
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                flight['response'] = self._send_measured('GET', url, auth,
+                                                         timeout, app, op, {})
+                return flight['response']
+            except Exception as err:
+                flight['error'] = err
+                raise
+            finally:
+                with self._flights_lock:
+                    del self._flights[key]
+                flight['done'].set()
+
+        if timeout is None:
+            timeout = self.setup['timeout']
+        if not flight['done'].wait(timeout):
+            raise self.transport.Timeout('Deadline exceeded for GET ' + url)
+        if flight['error'] is not None:
+            raise flight['error']
+        return flight['response']
+
+    def _send(self, method, url, auth, timeout, kwargs):
+        """send() without the coalescing or instrumentation.
+        """
+        if timeout is None:
+            timeout = self.setup['timeout']
+        deadline = None
+        if timeout is not None:
+            deadline = time.time() + timeout
+
+        retries = 0
+        if method in ('GET', 'DELETE'):
+            retries = self.setup['retries']
+        hedge = (method == 'GET' and not kwargs.get('stream') and
+                 self.setup['hedge_percentile'] is not None)
+        transport = self.transport
+
+        attempt = 0
+        while True:
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise transport.Timeout(
+                            'Deadline exceeded for ' + method + ' ' + url)
+            try:
+                if self.limiter is not None:
+                    response = self._send_limited(transport, method, url,
+                                                  auth, remaining, hedge,
+                                                  kwargs)
+                elif hedge:
+                    response = self._send_hedged(url, auth, remaining, kwargs)
+                else:
+                    response = transport.request(method, url, auth=auth,
+                                                 timeout=remaining, **kwargs)
+            except transport.errors:
+                if attempt >= retries:
+                    raise
+            else:
+                if attempt >= retries or \
+                   response.status_code not in (502, 503, 504):
+                    return response
+                response.close()
+
+            # full jitter: somewhere up to backoff * 2^attempt, but not
+            # past the deadline
+            pause = random.uniform(0, self.setup['retry_backoff'] *
+                                   (2 ** attempt))
+            if deadline is not None:
+                pause = min(pause, max(0, deadline - time.time()))
+            time.sleep(pause)
+            attempt += 1
+
+    def _send_limited(self, transport, method, url, auth, timeout, hedge,
+                      kwargs):
+        """One try at a query, once OpenDaylight.limiter lets it go, telling
+           the limiter how it went.
+        """
+        limiter = self.limiter
+        start = time.time()
+        if not limiter.acquire(timeout):
+            raise transport.Timeout('Deadline exceeded waiting to send ' +
+                                    method + ' ' + url)
+        if timeout is not None:
+            timeout = max(timeout - (time.time() - start), 0.001)
+        start = time.time()
+        healthy = False
+        try:
+            if hedge:
+                response = self._send_hedged(url, auth, timeout, kwargs)
+            else:
+                response = transport.request(method, url, auth=auth,
+                                             timeout=timeout, **kwargs)
+            healthy = response.status_code < 500
+            return response
+        finally:
+            limiter.release(time.time() - start, healthy)
+
+    def _send_hedged(self, url, auth, timeout, kwargs):
+        """GET url, and if that takes longer than setup['hedge_percentile']
+           of recent GETs, GET it again from a helper thread and return
+           whichever answers first.
+        """
+        transport = self.transport
+        if getattr(transport, 'interrupt', None) is None:
+            return transport.request('GET', url, auth=auth, timeout=timeout,
+                                     **kwargs)
+        with self._hedge_lock:
+            self._hedged_gets += 1
+            room = self._hedges < self.setup['hedge_budget'] * \
+                                  self._hedged_gets
+
+        race = None
+        samples = sorted(self._get_latencies)
+        # wait until there is some history before second guessing anything
+        if room and len(samples) >= 20:
+            rank = int(len(samples) * self.setup['hedge_percentile'] / 100.0)
+            delay = samples[min(rank, len(samples) - 1)]
+            with self._session_lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = ThreadPoolExecutor(
+                                        max_workers=self.setup['pool_size'])
+            race = {'lock':threading.Lock(), 'done':threading.Event(),
+                    'hedged':threading.Event(), 'sent':False,
+                    'response':None, 'transport':transport,
+                    'thread':threading.current_thread().ident}
+            deadline = None
+            if timeout is not None:
+                deadline = time.time() + timeout
+            self._hedge_executor.submit(self._hedge, race, time.time() + delay,
+                                        url, auth, deadline, kwargs)
+
+        start = time.time()
+        try:
+            response = transport.request('GET', url, auth=auth,
+                                         timeout=timeout, **kwargs)
+        except transport.errors:
+            if race is None:
+                raise
+            with race['lock']:
+                race['done'].set()
+                sent = race['sent']
+            # either the hedge answered first and cut this GET short, or
+            # this one failed with the hedge still on its way
+            if sent:
+                race['hedged'].wait()
+                if race['response'] is not None:
+                    return race['response']
+            raise
+        if race is not None:
+            with race['lock']:
+                race['done'].set()
+        self._get_latencies.append(time.time() - start)
+        return response
+
+    def _hedge(self, race, due, url, auth, deadline, kwargs):
+        """The helper thread's part in _send_hedged(): once due, if the
+           first GET still hasn't answered and the budget allows, GET url
+           again, and if that answers first, interrupt the first.
+        """
+        transport = race['transport']
+        try:
+            if race['done'].wait(max(due - time.time(), 0)):
+                return
+            with race['lock']:
+                if race['done'].is_set():
+                    return
+                with self._hedge_lock:
+                    if self._hedges >= self.setup['hedge_budget'] * \
+                                       self._hedged_gets:
+                        return
+                    self._hedges += 1
+                race['sent'] = True
+            timeout = None
+            if deadline is not None:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    return
+            start = time.time()
+            try:
+                response = transport.request('GET', url, auth=auth,
+                                             timeout=timeout, **kwargs)
+            except transport.errors:
+                return
+            self._get_latencies.append(time.time() - start)
+            if response.status_code >= 500:
+                return
+            with race['lock']:
+                race['response'] = response
+                # under the lock, so the calling thread can't have moved on
+                # to some other query yet
+                if not race['done'].is_set():
+                    transport.interrupt(race['thread'])
+        finally:
+            race['hedged'].set()
+
+    def pool_stats(self):
+        """Return a dictionary describing connection reuse so far:
+             'requests' - requests sent over the pool
+             'misses'   - requests that had to open a new connection
+             'hits'     - requests that reused a kept-alive connection
+
+           Counts are for the current transport only, and start over after
+           close().
+        """
+        transport = self._transport
+        if transport is None:
+            return {'requests':0, 'misses':0, 'hits':0}
+        return transport.pool_stats()
 
     def prepare(self, app, path):
         """Sets up the necessary details for the REST connection by calling
@@ -102,11 +502,23 @@ class OpenDaylight(object):
                          self.setup['port'] + self.setup['path']
 
         # the specific path we are building
-        self.url = self._base_url + app + '/' + self.setup['container'] + path
+        self.url = self.build_url(app, path)
+
+    def build_url(self, app, path):
+        """Return the URL for a REST query without storing it anywhere.
+
+           This takes the same arguments as prepare_url(), but leaves
+           OpenDaylight.url alone, so it is safe to call from several
+           threads sharing one OpenDaylight object.
+        """
+        return self.setup['http'] + self.setup['hostname'] + ':' + \
+               self.setup['port'] + self.setup['path'] + app + '/' + \
+               self.setup['container'] + path
 
     def prepare_auth(self):
         """Set up the credentials for the REST connection by creating
-           an auth object for Requests and shoving it into OpenDaylight.auth
+           an auth object for the transport and shoving it into
+           OpenDaylight.auth
 
            Currently, as far as I know, the OpenDaylight controller uses
            http basic auth.  If/when that changes this function should be
@@ -118,12 +530,728 @@ class OpenDaylight(object):
            and don't bother to call this function.  
         """
 
-        # stuff an HTTPBasicAuth object in here ready for use
-        self.auth = HTTPBasicAuth(self.setup['username'], 
-                                  self.setup['password'])
+        # stuff an auth object in here ready for use
+        self.auth = self.build_auth()
         #print("Prepare set up auth: " + self.setup['username'] + ', ' + \
         #      self.setup['password'])
 
+    def build_auth(self):
+        """Return an auth object for the transport without storing it in
+           OpenDaylight.auth.  See build_url() for why you might want this.
+           The transport keeps the last one it made, so this is cheap to
+           call for every query.
+        """
+        return self.transport.auth(self.setup['username'],
+                                   self.setup['password'])
+
+
+class _ConnectionTracker(object):
+    """The part of a transport that keeps track of which connection each
+       thread has a query out on, from when it is sent until the
+       connection is pooled or closed, so that interrupt() can cut it short.
+    """
+
+    def __init__(self):
+        self._active = {}
+        self._active_lock = threading.Lock()
+
+    def interrupt(self, thread_id):
+        """Make the query that thread is waiting on fail at once, by shutting
+           down its connection.  Does nothing if it isn't waiting on one.
+        """
+        with self._active_lock:
+            connection = self._active.pop(thread_id, None)
+            if connection is None:
+                return
+            connection.interrupted = True
+            if connection.sock is not None:
+                try:
+                    connection.sock.shutdown(socket.SHUT_RDWR)
+                except socket.error:
+                    pass
+
+    def _track(self, connection):
+        """This thread is about to send a query on connection.
+        """
+        connection.thread_id = threading.current_thread().ident
+        connection.interrupted = False
+        with self._active_lock:
+            self._active[connection.thread_id] = connection
+
+    def _untrack(self, connection):
+        """connection is done with, for now or for good.
+        """
+        thread_id = getattr(connection, 'thread_id', None)
+        with self._active_lock:
+            if self._active.get(thread_id) is connection:
+                del self._active[thread_id]
+
+
+class OpenDaylightRequestsTransport(_ConnectionTracker):
+    """Sends REST queries with Requests, over a Requests session mounted
+       with a connection pool of pool_size.  This is the default transport.
+
+       A transport has request(method, url, auth=None, timeout=None,
+       **kwargs), which returns a response like a Requests one, auth(),
+       close() and pool_stats(), along with Timeout, the exception raised
+       when a query takes too long, and errors, a tuple of the exceptions
+       that mean no response came back.  It may also have
+       interrupt(thread_id), which makes the query that thread is waiting
+       on fail at once; OpenDaylight.send() only hedges GETs when it does.
+    """
+
+    def __init__(self, pool_size=10):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from requests.auth import HTTPBasicAuth
+        from urllib3.connectionpool import (HTTPConnectionPool,
+                                            HTTPSConnectionPool)
+        _ConnectionTracker.__init__(self)
+        self._basic_auth = HTTPBasicAuth
+        self.Timeout = requests.exceptions.Timeout
+        self.errors = (requests.exceptions.ConnectionError,
+                       requests.exceptions.Timeout)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size,
+                              pool_maxsize=pool_size)
+        adapter.poolmanager.pool_classes_by_scheme = {
+            'http':_tracked_pool(HTTPConnectionPool, self),
+            'https':_tracked_pool(HTTPSConnectionPool, self)}
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._auth = (None, None)
+
+    def auth(self, username, password):
+        """Return an HTTPBasicAuth for username and password.
+        """
+        key, auth = self._auth
+        if key != (username, password):
+            auth = self._basic_auth(username, password)
+            self._auth = ((username, password), auth)
+        return auth
+
+    def request(self, method, url, auth=None, timeout=None, **kwargs):
+        """Send one query and return the Requests response.
+        """
+        return self.session.request(method, url, auth=auth, timeout=timeout,
+                                    **kwargs)
+
+    def close(self):
+        """Close every pooled connection.
+        """
+        self.session.close()
+
+    def pool_stats(self):
+        """See OpenDaylight.pool_stats().
+        """
+        stats = {'requests':0, 'misses':0, 'hits':0}
+        seen = set()
+        for adapter in self.session.adapters.values():
+            if id(adapter) in seen:
+                continue
+            seen.add(id(adapter))
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                stats['requests'] += pool.num_requests
+                stats['misses'] += pool.num_connections
+        stats['hits'] = stats['requests'] - stats['misses']
+        return stats
+
+
+def _tracked_pool(pool, transport):
+    """A subclass of a urllib3 connection pool class whose connections tell
+       transport which thread is using them.
+    """
+    base = pool.ConnectionCls
+
+    class TrackedConnection(base):
+        """A urllib3 connection known to transport while in use."""
+
+        def request(self, *args, **kwargs):
+            transport._track(self)
+            return base.request(self, *args, **kwargs)
+
+        def close(self):
+            transport._untrack(self)
+            return base.close(self)
+
+    class TrackedPool(pool):
+        """A urllib3 connection pool of TrackedConnections."""
+
+        ConnectionCls = TrackedConnection
+
+        def _put_conn(self, conn):
+            if conn is not None:
+                transport._untrack(conn)
+            return pool._put_conn(self, conn)
+
+    return TrackedPool
+
+
+class OpenDaylightStdlibTransport(_ConnectionTracker):
+    """Sends REST queries with http.client from the standard library,
+       keeping up to pool_size idle connections to reuse.  See
+       OpenDaylightRequestsTransport for what a transport looks like.
+
+       The Authorization header is worked out once and reused, and
+       responses are thin wrappers with the parts of a Requests response
+       this module uses: status_code, reason, headers, url, content, text,
+       json(), iter_content() and close().
+    """
+
+    Timeout = socket.timeout
+    errors = (socket.error, httplib.HTTPException)
+
+    def __init__(self, pool_size=10):
+        _ConnectionTracker.__init__(self)
+        self.pool_size = pool_size
+        self._idle = {}
+        self._lock = threading.Lock()
+        self._auth = (None, None)
+        self._requests = 0
+        self._connections = 0
+
+    def auth(self, username, password):
+        """Return the Authorization header value for username and password.
+        """
+        key, header = self._auth
+        if key != (username, password):
+            token = base64.b64encode(('%s:%s' % (username, password))
+                                     .encode('utf-8')).decode('ascii')
+            header = 'Basic ' + token
+            self._auth = ((username, password), header)
+        return header
+
+    def request(self, method, url, auth=None, timeout=None, data=None,
+                headers=None, stream=False):
+        """Send one query and return an _StdlibResponse.  auth may be what
+           auth() returned or a (username, password) tuple.  Unless stream
+           is set the whole body is read before this returns.
+        """
+        parts = urlsplit(url)
+        path = parts.path
+        if parts.query:
+            path += '?' + parts.query
+        send_headers = dict(headers or {})
+        if isinstance(auth, tuple):
+            auth = self.auth(*auth)
+        if auth is not None:
+            send_headers['Authorization'] = auth
+        if data is not None and not isinstance(data, bytes):
+            data = data.encode('utf-8')
+
+        key = (parts.scheme, parts.netloc)
+        connection = self._checkout(key, timeout)
+        self._track(connection)
+        try:
+            connection.request(method, path, data, send_headers)
+        except self.errors as err:
+            self._discard(connection)
+            # a kept-alive connection the Controller has since closed can
+            # fail while the query is still being written.  Nothing whole
+            # reached the Controller, so any method may go again.
+            if not connection.sock_reused or connection.interrupted or \
+               isinstance(err, socket.timeout):
+                raise
+            connection = self._connect(key, timeout)
+            self._track(connection)
+            try:
+                connection.request(method, path, data, send_headers)
+            except self.errors:
+                self._discard(connection)
+                raise
+        try:
+            raw = connection.getresponse()
+        except self.errors as err:
+            self._discard(connection)
+            # it can also take the whole query and close without a byte of
+            # answer.  The Controller may have acted on it by then, so only
+            # a query that changes nothing goes again here; the rest is up
+            # to OpenDaylight.send() and setup['retries']
+            if not connection.sock_reused or connection.interrupted or \
+               method not in _SAFE or not isinstance(err, _NO_RESPONSE):
+                raise
+            connection = self._connect(key, timeout)
+            self._track(connection)
+            try:
+                connection.request(method, path, data, send_headers)
+                raw = connection.getresponse()
+            except self.errors:
+                self._discard(connection)
+                raise
+        with self._lock:
+            self._requests += 1
+
+        response = _StdlibResponse(self, key, connection, raw, url)
+        if not stream:
+            response.content # pylint: disable=W0104
+        return response
+
+    def _checkout(self, key, timeout):
+        """An idle connection for key, or a new one.
+        """
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                connection = idle.pop() if idle else None
+            if connection is None:
+                return self._connect(key, timeout)
+            if not _dropped(connection):
+                break
+            connection.close()
+        connection.sock_reused = True
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        return connection
+
+    def _connect(self, key, timeout):
+        """A new connection for key.
+        """
+        scheme, netloc = key
+        if scheme == 'https':
+            connection = httplib.HTTPSConnection(netloc, timeout=timeout)
+        else:
+            connection = httplib.HTTPConnection(netloc, timeout=timeout)
+        connection.sock_reused = False
+        with self._lock:
+            self._connections += 1
+        return connection
+
+    def _release(self, key, connection):
+        """Keep connection for reuse, if there is room.
+        """
+        self._untrack(connection)
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.pool_size:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def _discard(self, connection):
+        """Close connection for good.
+        """
+        self._untrack(connection)
+        connection.close()
+
+    def close(self):
+        """Close every pooled connection.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+    def pool_stats(self):
+        """See OpenDaylight.pool_stats().
+        """
+        with self._lock:
+            return {'requests':self._requests, 'misses':self._connections,
+                    'hits':self._requests - self._connections}
+
+
+# methods OpenDaylightStdlibTransport may send twice if a kept-alive
+# connection closes before answering
+_SAFE = frozenset(['GET', 'HEAD'])
+
+# what http.client raises when a connection closes without a byte of answer
+_NO_RESPONSE = getattr(httplib, 'RemoteDisconnected', httplib.BadStatusLine)
+
+
+def _dropped(connection):
+    """True if an idle connection has been closed by the Controller, or has
+       something unasked for waiting on it.  Either way it is no use.
+    """
+    if connection.sock is None:
+        return True
+    try:
+        readable, _, _ = select.select([connection.sock], [], [], 0)
+    except (select.error, socket.error, ValueError):
+        return True
+    return bool(readable)
+
+
+class _StdlibResponse(object):
+    """What OpenDaylightStdlibTransport.request() returns.  Its connection
+       goes back to the pool once the body has been read.
+    """
+
+    def __init__(self, transport, key, connection, raw, url):
+        self.status_code = raw.status
+        self.reason = raw.reason
+        self.headers = raw.msg
+        self.url = url
+        self._transport = transport
+        self._key = key
+        self._connection = connection
+        self._raw = raw
+        self._content = None
+
+    @property
+    def content(self):
+        """The body as bytes.
+        """
+        if self._content is None:
+            self._content = self._raw.read()
+            self._done()
+        return self._content
+
+    @property
+    def text(self):
+        """The body as text.
+        """
+        charset = 'utf-8'
+        content_type = self.headers.get('Content-Type') or ''
+        if 'charset=' in content_type:
+            charset = content_type.split('charset=')[-1].split(';')[0]
+        return self.content.decode(charset.strip(), 'replace')
+
+    def json(self):
+        """The body decoded from json.
+        """
+        return json.loads(self.text)
+
+    def iter_content(self, chunk_size=1):
+        """Yield the body chunk_size bytes at a time without keeping it.
+        """
+        if self._content is not None:
+            yield self._content
+            return
+        while True:
+            chunk = self._raw.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+        self._content = b''
+        self._done()
+
+    def close(self):
+        """Give up on whatever of the body hasn't been read.
+        """
+        if self._connection is not None:
+            self._transport._discard(self._connection)
+            self._connection = None
+
+    def _done(self):
+        """The body has been read, so the connection can be reused.
+        """
+        connection, self._connection = self._connection, None
+        if connection is None:
+            return
+        if self._raw.will_close:
+            self._transport._discard(connection)
+        else:
+            self._transport._release(self._key, connection)
+
+
+# setup['transport'] names
+_TRANSPORTS = {'requests':OpenDaylightRequestsTransport,
+               'http.client':OpenDaylightStdlibTransport}
+
+
+class OpenDaylightInstrumentation(object):
+    """Counts and times every REST query made through OpenDaylight.send(),
+       by application ('flow', 'switch') and operation ('get', 'add', ...).
+       Turn it on with:
+
+          odl.instrumentation = OpenDaylightInstrumentation()
+
+       For each application and operation it keeps the number of calls,
+       how many of each http status came back (None for no response at
+       all), bytes sent and received, and a histogram of latencies in
+       seconds.  snapshot() returns all that as a dictionary and
+       prometheus() in Prometheus text format.
+
+       Hooks can be added for tracing and the like:
+          pre_hooks   - each is called as hook(app, op, method, url, kwargs)
+                        before a query is sent.  kwargs are the keyword
+                        arguments for Requests, so a hook may add headers.
+          post_hooks  - each is called as hook(app, op, method, url,
+                        response, latency, error) after a query is done.
+                        response is None if error is set.
+    """
+
+    # upper bounds of the latency histogram buckets, in seconds
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self.pre_hooks = []
+        self.post_hooks = []
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def measure(self, send, app, op, method, url, auth, timeout, kwargs):
+        """Call send(method, url, auth, timeout, kwargs), recording how it
+           went, and return what it returns.
+        """
+        for hook in self.pre_hooks:
+            hook(app, op, method, url, kwargs)
+        start = time.time()
+        response = None
+        error = None
+        try:
+            response = send(method, url, auth, timeout, kwargs)
+            return response
+        except Exception as err:
+            error = err
+            raise
+        finally:
+            latency = time.time() - start
+            self._record(app, op, kwargs, response, latency)
+            for hook in self.post_hooks:
+                hook(app, op, method, url, response, latency, error)
+
+    def _record(self, app, op, kwargs, response, latency):
+        """Add one call to the statistics.
+        """
+        sent = 0
+        data = kwargs.get('data')
+        if isinstance(data, bytes):
+            sent = len(data)
+        elif data is not None:
+            sent = len(data.encode('utf-8'))
+        received = 0
+        status = None
+        if response is not None:
+            status = response.status_code
+            length = response.headers.get('Content-Length')
+            if length is not None:
+                received = int(length)
+            elif not kwargs.get('stream'):
+                # a streamed body isn't read just to measure it
+                received = len(response.content or b'')
+        bucket = bisect.bisect_left(self.buckets, latency)
+
+        with self._lock:
+            stats = self._stats.get((app, op))
+            if stats is None:
+                stats = {'calls':0, 'status':{}, 'bytes_sent':0,
+                         'bytes_received':0, 'latency_sum':0.0,
+                         'latency_buckets':[0] * (len(self.buckets) + 1)}
+                self._stats[(app, op)] = stats
+            stats['calls'] += 1
+            stats['status'][status] = stats['status'].get(status, 0) + 1
+            stats['bytes_sent'] += sent
+            stats['bytes_received'] += received
+            stats['latency_sum'] += latency
+            stats['latency_buckets'][bucket] += 1
+
+    def snapshot(self):
+        """Return everything recorded so far as a dictionary:
+              {app: {op: {'calls':            number of calls,
+                          'status':           {http status: count},
+                          'bytes_sent':       request body bytes,
+                          'bytes_received':   response body bytes,
+                          'latency_sum':      total seconds,
+                          'latency_buckets':  [count, ...]}}}
+           latency_buckets[i] counts calls taking no more than buckets[i]
+           seconds and more than the bucket before; the last counts the
+           rest.
+        """
+        with self._lock:
+            snapshot = {}
+            for (app, op), stats in self._stats.items():
+                copy = dict(stats)
+                copy['status'] = dict(stats['status'])
+                copy['latency_buckets'] = list(stats['latency_buckets'])
+                snapshot.setdefault(app, {})[op] = copy
+            return snapshot
+
+    def prometheus(self):
+        """Return everything recorded so far in the Prometheus text
+           exposition format.
+        """
+        snapshot = self.snapshot()
+        rows = sorted((app, op, snapshot[app][op]) for app in snapshot
+                      for op in snapshot[app])
+        lines = []
+
+        def labels(app, op, **extra):
+            """Format a label set."""
+            pairs = [('app', app), ('op', op)] + sorted(extra.items())
+            return '{' + ','.join('%s="%s"' % (k, v) for k, v in pairs) + '}'
+
+        lines.append('# HELP opendaylight_requests_total REST queries sent '
+                     'to the Controller.')
+        lines.append('# TYPE opendaylight_requests_total counter')
+        for app, op, stats in rows:
+            for status, count in sorted(stats['status'].items(),
+                                        key=lambda item: str(item[0])):
+                code = 'none' if status is None else status
+                lines.append('opendaylight_requests_total' +
+                             labels(app, op, code=code) + ' %d' % count)
+        for name, key, text in (('sent', 'bytes_sent', 'Request'),
+                                ('received', 'bytes_received', 'Response')):
+            metric = 'opendaylight_request_bytes_' + name + '_total'
+            lines.append('# HELP ' + metric + ' ' + text + ' body bytes.')
+            lines.append('# TYPE ' + metric + ' counter')
+            for app, op, stats in rows:
+                lines.append(metric + labels(app, op) + ' %d' % stats[key])
+        metric = 'opendaylight_request_duration_seconds'
+        lines.append('# HELP ' + metric + ' REST query latency.')
+        lines.append('# TYPE ' + metric + ' histogram')
+        for app, op, stats in rows:
+            total = 0
+            for bound, count in zip(self.buckets + ('+Inf',),
+                                    stats['latency_buckets']):
+                total += count
+                lines.append(metric + '_bucket' +
+                             labels(app, op, le=bound) + ' %d' % total)
+            lines.append(metric + '_sum' + labels(app, op) +
+                         ' %r' % stats['latency_sum'])
+            lines.append(metric + '_count' + labels(app, op) +
+                         ' %d' % stats['calls'])
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        """Forget everything recorded so far.
+        """
+        with self._lock:
+            self._stats.clear()
+
+
+class OpenDaylightLimiter(object):
+    """Caps the number of REST queries in flight to the Controller, raising
+       the cap while the Controller keeps up and cutting it when it
+       doesn't.  Turn it on with:
+
+          odl.limiter = OpenDaylightLimiter()
+
+       and then push flows with as many workers as you like; the ones over
+       the cap wait their turn in OpenDaylight.send().
+
+       The cap grows by one for each cap's worth of queries that come back
+       healthy, as long as the cap is actually being used (additive
+       increase).  It is multiplied by backoff when a query fails, times
+       out or gets a 5xx back, and by the gentler slowdown when latency,
+       smoothed, climbs past tolerance times the lowest seen lately
+       (multiplicative decrease).  Cuts happen at most once per smoothed
+       latency, so that one bad moment counts once rather than once per
+       query caught in it.
+
+       OpenDaylightLimiter.limit is the current cap, in_flight how many
+       queries are out now and waiting how many are queued for a turn;
+       stats() has all of those at once.
+    """
+
+    def __init__(self, initial_limit=4, min_limit=1, max_limit=64,
+                 tolerance=2.0, backoff=0.5, slowdown=0.9):
+        """Optional arguments:
+            initial_limit - queries allowed in flight to start with, kept
+                            between min_limit and max_limit
+            min_limit     - the cap never goes below this
+            max_limit     - nor above this
+            tolerance     - how many times the lowest latency counts as
+                            slow
+            backoff       - what the cap is multiplied by on a failure
+            slowdown      - what the cap is multiplied by when slow
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.slowdown = slowdown
+        self.in_flight = 0
+        self.waiting = 0
+        self._limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self._smoothed = None
+        self._lowest = None
+        self._last_cut = 0.0
+        self._condition = threading.Condition(threading.Lock())
+
+    @property
+    def limit(self):
+        """How many queries may be in flight right now.
+        """
+        return int(self._limit)
+
+    def acquire(self, timeout=None):
+        """Wait for a turn to send a query, for up to timeout seconds.
+           Returns False if the time ran out first.
+        """
+        with self._condition:
+            if self.in_flight < int(self._limit):
+                self.in_flight += 1
+                return True
+            deadline = None
+            if timeout is not None:
+                deadline = time.time() + timeout
+            self.waiting += 1
+            try:
+                while self.in_flight >= int(self._limit):
+                    remaining = None
+                    if deadline is not None:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            return False
+                    self._condition.wait(remaining)
+                self.in_flight += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self, latency, healthy=True):
+        """Give back a turn, saying how long the query took and whether it
+           came back healthy.
+        """
+        with self._condition:
+            busy = self.in_flight
+            self.in_flight -= 1
+            now = time.time()
+            if healthy:
+                if self._smoothed is None:
+                    self._smoothed = latency
+                else:
+                    self._smoothed += 0.1 * (latency - self._smoothed)
+                # the lowest latency creeps back up slowly, so a Controller
+                # that has become slower for good is taken as it is now
+                if self._lowest is None or latency < self._lowest:
+                    self._lowest = latency
+                else:
+                    self._lowest *= 1.001
+
+            cut = None
+            if not healthy:
+                cut = self.backoff
+            elif self._smoothed > self.tolerance * self._lowest:
+                cut = self.slowdown
+            if cut is not None:
+                if now - self._last_cut > (self._smoothed or 0):
+                    self._limit = max(self.min_limit, self._limit * cut)
+                    self._last_cut = now
+            elif busy * 2 >= self._limit:
+                self._limit = min(self.max_limit,
+                                  self._limit + 1.0 / self._limit)
+            self._condition.notify(max(1, int(self._limit) - self.in_flight))
+
+    def stats(self):
+        """Return {'limit', 'in_flight', 'waiting', 'latency'}, latency
+           being the smoothed latency in seconds, or None before any query.
+        """
+        with self._condition:
+            return {'limit':int(self._limit), 'in_flight':self.in_flight,
+                    'waiting':self.waiting, 'latency':self._smoothed}
+
+
+class OpenDaylightResult(namedtuple('OpenDaylightResult',
+                                    'data status elapsed url response')):
+    """What one call_*() method call got back from the Controller.
+
+       OpenDaylightResult.data holds the decoded json, unwrapped the same way
+       the older methods unwrap it (so a list of flowConfigs rather than
+       {'flowConfig': [...]}), or None for calls that return nothing.
+       OpenDaylightResult.status is the http code, elapsed the seconds the
+       call took, url the url it went to and response the transport's
+       response object.
+    """
+
+    __slots__ = ()
+
 
 class OpenDaylightFlow(object):
     """OpenDaylightFlow is an object that talks to the OpenDaylight 
@@ -143,24 +1271,46 @@ class OpenDaylightFlow(object):
        we don't statically define what those fields are here in this
        object.  This makes this library code more flexible as flowConfig 
        changes over time.  After all, this is REST, not RPC.
+
+       Because OpenDaylightFlow.request and OpenDaylightFlow.flows are
+       shared, one OpenDaylightFlow shouldn't be used by several threads at
+       once through get(), add() and delete().  The call_get(), call_add()
+       and call_delete() methods do the same jobs without touching any
+       shared state, returning an OpenDaylightResult instead, so those are
+       safe to use from as many threads as you like.
+
+       OpenDaylightFlow.cache optionally holds an OpenDaylightFlowCache.
+       When it is set, get() answers from the cache when it can, and
+       add() and delete() throw out whatever they may have made stale.
+
+       OpenDaylightFlow.validator optionally holds an
+       OpenDaylightFlowValidator.  When it is set, add() and friends turn
+       away flows it finds fault with without sending anything.
     """
 
-    def __init__(self, odl):
+    def __init__(self, odl, cache=None, validator=None):
         """Mandatory argument: 
             odl      - an OpenDaylight object
+
+           Optional arguments:
+            cache    - an OpenDaylightFlowCache object
+            validator - an OpenDaylightFlowValidator object
         """
         self.odl = odl
         self.__app = 'flow'
         self.request = None
         self.flows = None
+        self.cache = cache
+        self.validator = validator
 
-    def get(self, node_id=None, flow_name=None):
+    def get(self, node_id=None, flow_name=None, timeout=None):
         """Get Flows specified on the Controller and stuffs the results into
            the OpenDaylightFlow.flows dictionary.
 
              Optional Arguments: 
                 node_id     -   returns flows just for that switch dpid
                 flow_name   -   returns the specifically named flow on that switch
+                timeout     -   seconds to wait, overriding setup['timeout']
         """
 
         # clear out any remaining crud from previous calls
@@ -177,56 +1327,377 @@ class OpenDaylightFlow(object):
             self.odl.prepare(self.__app, '/' + 'OF/' + node_id + '/' 
                          + flow_name + '/')
 
-        self.request = requests.get(url=self.odl.url, auth=self.odl.auth)
-
-        if self.request.status_code == 200:
-            self.flows = self.request.json()
-            if 'flowConfig' in self.flows:
-                self.flows = self.flows.get('flowConfig')
+        result = self._call_get(node_id, flow_name, timeout)
+        self.request = result.response
+        if result.status == 200:
+            self.flows = result.data
         else:
-            raise OpenDaylightError({'url':self.odl.url, 
-                                     'http_code':self.request.status_code,
-                                     'msg':self.request.text})
+            raise OpenDaylightError(_result_error(result))
 
+    def call_get(self, node_id=None, flow_name=None, timeout=None):
+        """Same as get(), but returns an OpenDaylightResult whose data is
+           what get() would have put in OpenDaylightFlow.flows, and leaves
+           this object and the OpenDaylight object alone.
+        """
+        return _check_result(self._call_get(node_id, flow_name, timeout), 200)
 
-    def add(self, flow):
+    def _call_get(self, node_id, flow_name, timeout):
+        """call_get() without the status check.
+        """
+        if node_id is None:
+            path = '/'
+        elif flow_name is None:
+            path = '/' + 'OF/' + node_id + '/'
+        else:
+            path = '/' + 'OF/' + node_id + '/' + flow_name + '/'
+        url = self.odl.build_url(self.__app, path)
+        start = time.time()
+
+        response = None
+        if self.cache is not None:
+            key = (self.odl.setup['container'], node_id, flow_name)
+            response = self.cache.lookup(key)
+        if response is None:
+            response = self.odl.send('GET', url, self.odl.build_auth(),
+                                     timeout, app=self.__app, op='get')
+            if self.cache is not None and response.status_code == 200:
+                self.cache.store(key, response)
+
+        flows = None
+        if response.status_code == 200:
+            flows = response.json()
+            if 'flowConfig' in flows:
+                flows = flows.get('flowConfig')
+        return OpenDaylightResult(flows, response.status_code,
+                                  time.time() - start, url, response)
+
+    def add(self, flow, timeout=None):
         """Given a dictionary corresponding to a flowConfig, add this flow to 
            the Controller.  Note that the switch dpid and the flow's name is
-           specified in the flowConfig passed in.
+           specified in the flowConfig passed in.  An OpenDaylightCompactFlow
+           will do just as well.
+
+           Optional Arguments:
+              timeout     -   seconds to wait, overriding setup['timeout']
         """
         if hasattr(self, 'request'):
             del self.request
+        self._validate(flow)
         #print(flow)
         self.odl.prepare(self.__app, '/' + flow['node']['@type'] + '/' + 
                      flow['node']['@id'] + '/' + flow['name'] + '/')
+        result = self._call_add(flow, timeout)
+        self.request = result.response
+
+        if result.status != 201:
+            raise OpenDaylightError(_result_error(result))
+
+    def call_add(self, flow, timeout=None):
+        """Same as add(), but returns an OpenDaylightResult and leaves this
+           object and the OpenDaylight object alone.
+        """
+        self._validate(flow)
+        return _check_result(self._call_add(flow, timeout), 201)
+
+    def _validate(self, flow):
+        """Raise OpenDaylightError if there is a validator and it finds
+           fault with flow.
+        """
+        if self.validator is not None:
+            problems = self.validator.validate(flow)
+            if problems:
+                raise OpenDaylightError({'url':None, 'http_code':None,
+                                         'msg':'; '.join(problems)})
+
+    def _call_add(self, flow, timeout):
+        """call_add() without the status check.
+        """
+        if isinstance(flow, OpenDaylightCompactFlow):
+            flow = flow.to_dict()
+        url = self.odl.build_url(self.__app, '/' + flow['node']['@type'] +
+                                 '/' + flow['node']['@id'] + '/' +
+                                 flow['name'] + '/')
         headers = {'Content-type': 'application/json'}
-        body = json.dumps(flow)
-        self.request = requests.post(url=self.odl.url, auth=self.odl.auth,
-                                     data=body, headers=headers)
+        start = time.time()
+        response = self.odl.send('POST', url, self.odl.build_auth(), timeout,
+                                 app=self.__app, op='add',
+                                 data=json.dumps(flow), headers=headers)
+        self._invalidate(flow['node']['@id'], flow['name'])
+        return OpenDaylightResult(None, response.status_code,
+                                  time.time() - start, url, response)
+
+    def add_many(self, flows, max_workers=8, timeout=None):
+        """Add many flows to the Controller at once, using up to max_workers
+           concurrent requests.  flows may be any iterable of flowConfig
+           dictionaries, including a generator.
+
+           Unlike add(), this does not stop at the first failure.  It returns
+           a list with one result dictionary per flow, in the same order the
+           flows were given:
+              {'node_id':    the switch dpid,
+               'flow_name':  the flow's name,
+               'http_code':  http status code, or None if no response,
+               'latency':    seconds spent on the request,
+               'error':      None on success, otherwise what went wrong}
+
+           timeout applies to each request, as it does for add().  A flow
+           turned away by OpenDaylightFlow.validator gets a result with an
+           http_code of None and isn't sent.
+           OpenDaylightFlow.request and OpenDaylightFlow.flows are not touched.
+           Connections beyond setup['pool_size'] are not kept alive, so raise
+           that to at least max_workers before a big push.
+        """
+        return list(self.iadd_many(flows, max_workers, timeout))
+
+    def iadd_many(self, flows, max_workers=8, timeout=None):
+        """Same as add_many(), but yields each result as soon as it and all
+           the results before it are done, rather than building a list.  Only
+           a handful of flows are read ahead of the requests in flight, so
+           this is the one to use for very large or generated flow sets.
+        """
+        return _run_bulk(lambda flow: self._add_one(flow, timeout),
+                         flows, max_workers)
+
+    def delete_many(self, flows, max_workers=8, timeout=None):
+        """Delete many flows from the Controller at once, using up to
+           max_workers concurrent requests.
 
-        if self.request.status_code != 201:
-            raise OpenDaylightError({'url':self.odl.url, 
-                                     'http_code':self.request.status_code,
-                                     'msg':self.request.text})
+           Mandatory Arguments:
+              flows   -   an iterable of (node_id, flow_name) pairs
+
+           Returns a list of result dictionaries, as add_many() does.
+        """
+        return list(self.idelete_many(flows, max_workers, timeout))
+
+    def idelete_many(self, flows, max_workers=8, timeout=None):
+        """Same as delete_many(), but yields results as iadd_many() does.
+        """
+        return _run_bulk(lambda pair: self._delete_one(pair, timeout),
+                         flows, max_workers)
+
+    def _add_one(self, flow, timeout):
+        """Worker for iadd_many(): add one flow and describe how it went.
+        """
+        result = {'node_id':None, 'flow_name':None, 'http_code':None,
+                  'latency':None, 'error':None}
+        start = time.time()
+        try:
+            if self.validator is not None:
+                problems = self.validator.validate(flow)
+                if problems:
+                    result.update(_flow_key(flow))
+                    result['error'] = '; '.join(problems)
+                    result['latency'] = time.time() - start
+                    return result
+            result['node_id'] = flow['node']['@id']
+            result['flow_name'] = flow['name']
+            call = self._call_add(flow, timeout)
+            result['http_code'] = call.status
+            if call.status != 201:
+                result['error'] = call.response.text
+        except Exception as err: #pylint: disable=W0703
+            result['error'] = repr(err)
+        result['latency'] = time.time() - start
+        return result
+
+    def _delete_one(self, pair, timeout):
+        """Worker for idelete_many(): delete one flow and describe how it went.
+        """
+        result = {'node_id':None, 'flow_name':None, 'http_code':None,
+                  'latency':None, 'error':None}
+        start = time.time()
+        try:
+            result['node_id'], result['flow_name'] = pair
+            call = self._call_delete(result['node_id'], result['flow_name'],
+                                     timeout)
+            result['http_code'] = call.status
+            if call.status != 200:
+                result['error'] = call.response.text
+        except Exception as err: #pylint: disable=W0703
+            result['error'] = repr(err)
+        result['latency'] = time.time() - start
+        return result
+
+    def iter_flows(self, node_id=None):
+        """Yield the flows specified on the Controller one at a time, as they
+           are read off the wire, instead of loading the whole response the
+           way get() does.  Memory use stays flat however many flows there
+           are.  OpenDaylightFlow.request and OpenDaylightFlow.flows are not
+           touched, and nothing is sent until the first flow is asked for.
+
+             Optional Arguments:
+                node_id     -   yields flows just for that switch dpid
+        """
+        if node_id is None:
+            path = '/'
+        else:
+            path = '/' + 'OF/' + node_id + '/'
+        return _iter_response(self.odl, self.__app, 'get', path,
+                              'flowConfig')
+
+    def sync(self, desired_flows, node_id=None, dry_run=False, max_workers=8):
+        """Make the flows on the Controller match desired_flows, using as
+           few adds and deletes as possible.
+
+           The current flows are fetched with get(), controller-wide or just
+           for node_id, and compared with desired_flows one by one, by
+           switch and name.  Values are compared as the Controller would
+           report them, so a priority of 500 matches u'500'.  Flows missing
+           from the Controller are added, flows that differ are replaced
+           (deleted and added again, since there is no update call) and
+           flows that aren't desired are deleted.  When node_id is given,
+           only that switch is looked at, and desired flows for any other
+           switch are ignored.
+
+           Returns a dictionary of what was (or with dry_run, would be) done:
+              {'add':      [flowConfig, ...],
+               'replace':  [flowConfig, ...],
+               'delete':   [(node_id, flow_name), ...],
+               'results':  [result, ...]}
+           where 'results' holds the result dictionaries from delete_many()
+           and then add_many(), and is empty for a dry run.  Failures are
+           reported there rather than raised.
+        """
+        self.get(node_id=node_id)
+        current = self.flows
+        if isinstance(current, dict):
+            current = [current]
+
+        # (switch, name) -> fingerprint for what is there now
+        fingerprints = {}
+        for flow in current or []:
+            fingerprints[(flow['node']['@id'], flow['name'])] = \
+                _fingerprint(flow)
+
+        plan = {'add':[], 'replace':[], 'delete':[], 'results':[]}
+        for flow in desired_flows:
+            key = (flow['node']['@id'], flow['name'])
+            if node_id is not None and key[0] != node_id:
+                continue
+            if key not in fingerprints:
+                plan['add'].append(flow)
+            elif fingerprints.pop(key) != _fingerprint(flow):
+                plan['replace'].append(flow)
+        plan['delete'] = list(fingerprints.keys())
+
+        if not dry_run:
+            doomed = plan['delete'] + [(flow['node']['@id'], flow['name'])
+                                       for flow in plan['replace']]
+            plan['results'] = self.delete_many(doomed, max_workers)
+            plan['results'].extend(self.add_many(plan['add'] +
+                                                 plan['replace'],
+                                                 max_workers))
+        return plan
+
+    def dump(self, path, node_id=None):
+        """Write the flows specified on the Controller to a snapshot file at
+           path, one flowConfig per line as json, and return how many were
+           written.  The flows are streamed with iter_flows(), so memory use
+           stays flat however many there are.  If path ends in '.gz' the
+           snapshot is gzip compressed.
+
+             Optional Arguments:
+                node_id     -   dumps flows just for that switch dpid
+        """
+        count = 0
+        with _open_snapshot(path, 'wb') as snapshot:
+            for flow in self.iter_flows(node_id):
+                snapshot.write(json.dumps(flow, sort_keys=True,
+                                          separators=(',', ':'))
+                               .encode('utf-8') + b'\n')
+                count += 1
+        return count
+
+    def restore(self, path, resume=True, max_workers=8, timeout=None):
+        """Add the flows in a snapshot written by dump() to the Controller,
+           reading it a line at a time and adding up to max_workers flows
+           at once the way iadd_many() does.
+
+           With resume, the flows already on the Controller are listed first
+           (by switch and name only) and any snapshot flow among them is
+           skipped rather than sent, so a restore that was interrupted can
+           simply be run again.
+
+           Returns a dictionary summing up the restore:
+              {'added':    number of flows added,
+               'skipped':  number of flows already on the Controller,
+               'failed':   [result, ...]}
+           where 'failed' holds the iadd_many() result dictionaries for the
+           flows that couldn't be added.
+        """
+        present = set()
+        if resume:
+            for flow in self.iter_flows():
+                present.add((_node_id(flow['node']), flow['name']))
+
+        summary = {'added':0, 'skipped':0, 'failed':[]}
+
+        def missing(flows):
+            """The snapshot flows not already on the Controller."""
+            for flow in flows:
+                if (_node_id(flow['node']), flow['name']) in present:
+                    summary['skipped'] += 1
+                else:
+                    yield flow
+
+        with _open_snapshot(path, 'rb') as snapshot:
+            flows = (json.loads(line.decode('utf-8')) for line in snapshot
+                     if line.strip())
+            for result in self.iadd_many(missing(flows), max_workers,
+                                         timeout):
+                if result['error'] is None:
+                    summary['added'] += 1
+                else:
+                    summary['failed'].append(result)
+        return summary
+
+    def table(self):
+        """Return an OpenDaylightFlowTable built from OpenDaylightFlow.flows,
+           as left by the last call to get().
+        """
+        flows = self.flows
+        if isinstance(flows, dict):
+            flows = [flows]
+        return OpenDaylightFlowTable(flows or [])
+
+    def analyze(self):
+        """Return OpenDaylightFlowAnalyzer(...).analyze() for
+           OpenDaylightFlow.flows, as left by the last call to get().
+        """
+        flows = self.flows
+        if isinstance(flows, dict):
+            flows = [flows]
+        return OpenDaylightFlowAnalyzer(flows or []).analyze()
+
+    def _invalidate(self, node_id, flow_name):
+        """Drop anything cached that a change to this flow makes stale.
+        """
+        if self.cache is not None:
+            self.cache.invalidate(self.odl.setup['container'], node_id,
+                                  flow_name)
 
     #def update(self):
     #    """Update a flow to a Node on the Controller
     #    """
     #    raise NotImplementedError("update()")
 
-    def delete(self, node_id, flow_name):
+    def delete(self, node_id, flow_name, timeout=None):
         """Delete a flow to a Node on the Controller
 
            Mandatory Arguments: 
               node_id     -   the switch dpid
               flow_name   -   the specifically named flow on that switch
+
+           Optional Arguments:
+              timeout     -   seconds to wait, overriding setup['timeout']
         """
         if hasattr(self, 'request'):
             del self.request
 
         self.odl.prepare(self.__app, '/' + 'OF/' + node_id + '/' + 
                          flow_name + '/')
-        self.request = requests.delete(url=self.odl.url, auth=self.odl.auth)
+        result = self._call_delete(node_id, flow_name, timeout)
+        self.request = result.response
 
         # note, if you wanted to pass in a flowConfig style dictionary, 
         # this is how you would do it.  This is what I did initially, but 
@@ -234,10 +1705,1103 @@ class OpenDaylightFlow(object):
         #self.prepare(self.__app, '/' + flow['node']['@type'] + '/' + 
         #             flow['node']['@id'] + '/' + flow['name'] + '/')
 
-        if self.request.status_code != 200:
-            raise OpenDaylightError({'url':self.odl.url, 
-                                     'http_code':self.request.status_code,
-                                     'msg':self.request.text})
+        if result.status != 200:
+            raise OpenDaylightError(_result_error(result))
+
+    def call_delete(self, node_id, flow_name, timeout=None):
+        """Same as delete(), but returns an OpenDaylightResult and leaves
+           this object and the OpenDaylight object alone.
+        """
+        return _check_result(self._call_delete(node_id, flow_name, timeout),
+                             200)
+
+    def _call_delete(self, node_id, flow_name, timeout):
+        """call_delete() without the status check.
+        """
+        url = self.odl.build_url(self.__app, '/' + 'OF/' + node_id + '/' +
+                                 flow_name + '/')
+        start = time.time()
+        response = self.odl.send('DELETE', url, self.odl.build_auth(),
+                                 timeout, app=self.__app, op='delete')
+        self._invalidate(node_id, flow_name)
+        return OpenDaylightResult(None, response.status_code,
+                                  time.time() - start, url, response)
+
+
+class OpenDaylightFlowQueue(object):
+    """A write-behind queue of flow adds and deletes, sent to the
+       Controller by background workers so that callers don't wait on
+       each round trip:
+
+           queue = OpenDaylightFlowQueue(OpenDaylightFlow(odl), delay=1.0)
+           future = queue.add(flow)
+           queue.delete(node_id, flow_name)
+           ...
+           queue.flush()
+           print(future.result())
+
+       Changes still waiting to be sent are kept by switch and flow name,
+       and a new change to the same flow is folded into the waiting one:
+       add then delete cancels out (unless this queue has seen the flow on
+       the Controller already, or is still sending an earlier change to
+       it, when it is just a delete), add then add
+       keeps the last flow, and delete then add becomes a replace (delete,
+       then add).  A change
+       waits at least delay seconds after the first one for its flow, to
+       give later ones the chance to fold in.  Changes to a flow already
+       being sent wait until that is done, so each flow's changes reach
+       the Controller in order.
+
+       add() and delete() return a concurrent.futures.Future whose result
+       is a dictionary like the ones OpenDaylightFlow.add_many() returns,
+       for whatever was finally sent for that flow.  Changes that cancelled
+       out get a result with an http_code of None and no error.
+
+       Each worker takes an even share of the changes that are due, and
+       no more than batch_size at a time, so up to max_workers of them are
+       sent at once.
+       Call close() when done, which sends whatever is still waiting.
+    """
+
+    # (waiting change, new change) -> what to send instead
+    _collapse = {('add', 'add'):'add', ('add', 'delete'):None,
+                 ('delete', 'add'):'replace', ('delete', 'delete'):'delete',
+                 ('replace', 'add'):'replace',
+                 ('replace', 'delete'):'delete'}
+
+    def __init__(self, flow, max_workers=4, delay=0.0, batch_size=32,
+                 timeout=None):
+        """Mandatory argument:
+            flow        - the OpenDaylightFlow to send changes through
+
+           Optional arguments:
+            max_workers - how many changes may be in flight at once
+            delay       - seconds a change waits to be folded into
+            batch_size  - most changes a worker takes at a time
+            timeout     - seconds each request may take, overriding
+                          setup['timeout']
+        """
+        self.flow = flow
+        self.delay = delay
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self._pending = OrderedDict()
+        self._in_flight = set()
+        # flows this queue has seen on the Controller
+        self._present = set()
+        self._flushing = 0
+        self._closed = False
+        self._condition = threading.Condition(threading.Lock())
+        self._workers = [threading.Thread(target=self._run)
+                         for _ in range(max_workers)]
+        for worker in self._workers:
+            worker.daemon = True
+            worker.start()
+
+    def __len__(self):
+        """How many flows have changes waiting or in flight.
+        """
+        with self._condition:
+            return len(self._pending) + len(self._in_flight)
+
+    def add(self, flow):
+        """Queue adding flow, returning a Future for the outcome.
+        """
+        if isinstance(flow, OpenDaylightCompactFlow):
+            flow = flow.to_dict()
+        return self._enqueue((flow['node']['@id'], flow['name']), 'add', flow)
+
+    def delete(self, node_id, flow_name):
+        """Queue deleting a flow, returning a Future for the outcome.
+        """
+        return self._enqueue((node_id, flow_name), 'delete', None)
+
+    def _enqueue(self, key, op, flow):
+        """Fold a change into whatever is waiting for its flow.
+        """
+        future = Future()
+        cancelled = None
+        with self._condition:
+            if self._closed:
+                raise RuntimeError('OpenDaylightFlowQueue is closed')
+            entry = self._pending.get(key)
+            if entry is None:
+                self._pending[key] = {'op':op, 'flow':flow,
+                                      'futures':[future],
+                                      'due':time.time() + self.delay}
+            else:
+                entry['futures'].append(future)
+                entry['op'] = self._collapse[(entry['op'], op)]
+                # an earlier add still in flight may yet put it there
+                if entry['op'] is None and (key in self._present or
+                                            key in self._in_flight):
+                    entry['op'] = 'delete'
+                if entry['op'] is None:
+                    cancelled = self._pending.pop(key)['futures']
+                elif op == 'add':
+                    entry['flow'] = flow
+                else:
+                    entry['flow'] = None
+            self._condition.notify_all()
+        if cancelled:
+            result = {'node_id':key[0], 'flow_name':key[1], 'http_code':None,
+                      'latency':0, 'error':None}
+            for each in cancelled:
+                each.set_result(result)
+        return future
+
+    def wait(self, timeout=None):
+        """Wait until nothing is waiting or in flight, for up to timeout
+           seconds.  Returns False if the time ran out first.
+        """
+        deadline = None
+        if timeout is not None:
+            deadline = time.time() + timeout
+        with self._condition:
+            while self._pending or self._in_flight:
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return False
+                self._condition.wait(remaining)
+            return True
+
+    def flush(self, timeout=None):
+        """Send everything waiting now, without waiting out the delay, and
+           then wait() for it.
+        """
+        with self._condition:
+            self._flushing += 1
+            self._condition.notify_all()
+        try:
+            return self.wait(timeout)
+        finally:
+            with self._condition:
+                self._flushing -= 1
+
+    def close(self):
+        """Send everything waiting and stop the workers.
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join()
+
+    def _take(self):
+        """Wait for, and claim, a batch of changes that are due.  Returns
+           None once closed and empty.
+        """
+        with self._condition:
+            while True:
+                now = time.time()
+                hurry = self._flushing or self._closed
+                workers = len(self._workers)
+                due = []
+                next_due = None
+                for key, entry in self._pending.items():
+                    if key in self._in_flight:
+                        continue
+                    if not hurry and entry['due'] > now:
+                        # entries are in order of their first change, so
+                        # none after this one are due either
+                        next_due = entry['due']
+                        break
+                    due.append(key)
+                    if len(due) >= self.batch_size * workers:
+                        break
+                if due:
+                    # leave the rest for the other workers
+                    share = (len(due) + workers - 1) // workers
+                    claimed = []
+                    for key in due[:min(share, self.batch_size)]:
+                        self._in_flight.add(key)
+                        claimed.append((key, self._pending.pop(key)))
+                    return claimed
+                if self._closed and not self._pending:
+                    return None
+                timeout = None
+                if next_due is not None:
+                    timeout = next_due - now
+                self._condition.wait(timeout)
+
+    def _run(self):
+        """Worker: send batches until closed.
+        """
+        while True:
+            batch = self._take()
+            if batch is None:
+                return
+            for key, entry in batch:
+                result = None
+                try:
+                    result = self._send(key, entry)
+                except Exception as err: #pylint: disable=W0703
+                    for future in entry['futures']:
+                        future.set_exception(err)
+                else:
+                    for future in entry['futures']:
+                        future.set_result(result)
+                finally:
+                    with self._condition:
+                        self._note(key, entry['op'], result)
+                        self._in_flight.discard(key)
+                        self._condition.notify_all()
+
+    def _note(self, key, op, result):
+        """Keep track of whether a flow is on the Controller, from how a
+           change to it went.
+        """
+        if result is None or result['http_code'] is None:
+            return
+        if op == 'delete':
+            if result['http_code'] in (200, 404):
+                self._present.discard(key)
+        elif result['http_code'] in (201, 409):
+            # a 409 means it was there already
+            self._present.add(key)
+
+    def _send(self, key, entry):
+        """Send one folded change and return its result dictionary.
+        """
+        if entry['op'] == 'add':
+            return self.flow._add_one(entry['flow'], self.timeout)
+        result = self.flow._delete_one(key, self.timeout)
+        if entry['op'] == 'delete' or \
+           (result['error'] is not None and result['http_code'] != 404):
+            return result
+        # replace: a flow that was already gone is fine to add
+        return self.flow._add_one(entry['flow'], self.timeout)
+
+
+class OpenDaylightFlowCache(object):
+    """A read-through cache of OpenDaylightFlow.get() responses, for code
+       that asks the Controller the same question over and over.
+
+       Hand one of these to OpenDaylightFlow() and get() keeps successful
+       responses keyed by (container, node_id, flow_name), where node_id
+       and flow_name are None for switch-wide and controller-wide listings.
+       Entries expire after ttl seconds, and once there are more than
+       max_entries the least recently used are thrown out.  add() and
+       delete() on any OpenDaylightFlow sharing this cache throw out the
+       flow they touched along with the listings that would include it.
+       Changes made by anything else go unnoticed until the ttl runs out.
+
+       OpenDaylightFlowCache.hits and OpenDaylightFlowCache.misses count
+       lookups so far.
+    """
+
+    def __init__(self, ttl=30, max_entries=1024):
+        """Optional arguments:
+            ttl          - seconds to keep a response
+            max_entries  - most responses to keep
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(self, key):
+        """Return the response cached for key, or None.
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None or entry[0] < time.time():
+                self.misses += 1
+                return None
+            # put it back at the most recently used end
+            self._entries[key] = entry
+            self.hits += 1
+            return entry[1]
+
+    def store(self, key, response):
+        """Cache response under key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.time() + self.ttl, response)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, container, node_id, flow_name):
+        """Throw out a flow, its switch's listing and the controller-wide
+           listing.
+        """
+        with self._lock:
+            self._entries.pop((container, node_id, flow_name), None)
+            self._entries.pop((container, node_id, None), None)
+            self._entries.pop((container, None, None), None)
+
+    def clear(self):
+        """Throw out everything.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return a dictionary with the hits, misses and entries so far.
+        """
+        with self._lock:
+            return {'hits':self.hits, 'misses':self.misses,
+                    'entries':len(self._entries)}
+
+
+class OpenDaylightFlowTable(object):
+    """An indexed, in-memory table of flowConfig dictionaries, such as the
+       list OpenDaylightFlow.get() leaves in OpenDaylightFlow.flows.
+
+       Flows are indexed by switch, by (switch, name) and by the value of
+       each field named in OpenDaylightFlowTable.fields, so that lookups
+       don't have to walk the whole list:
+          table.get(node_id, flow_name)   - one flow, or None
+          table.by_node(node_id)          - all flows on a switch
+          table.filter(node_id=None, **fields)
+                                          - flows matching every field given,
+                                            e.g. filter(etherType='0x800')
+          table.priority_range(low, high, node_id=None)
+                                          - flows with low <= priority <= high
+          flow in table                   - same test as flow in list
+
+       Field values are compared as strings, since that is how the
+       Controller hands them back; filter(priority=500) finds a priority of
+       u'500'.
+    """
+
+    # flowConfig fields worth indexing; anything else can still be matched
+    # by filter(), it just has to look at each of the flows on the way
+    fields = ('ingressPort', 'etherType', 'priority', 'protocol', 'vlanId',
+              'nwSrc', 'nwDst', 'dlSrc', 'dlDst', 'tpSrc', 'tpDst',
+              'actions')
+
+    def __init__(self, flows=()):
+        """Optional argument:
+            flows    - an iterable of flowConfig dictionaries
+        """
+        self._flows = {}
+        self._by_node = {}
+        self._by_field = dict((field, {}) for field in self.fields)
+        self._priorities = []
+        # sort the priority index once at the end, rather than flow by flow
+        self._sorted = False
+        for flow in flows:
+            entry = self._index(flow)
+            if entry is not None:
+                self._priorities.append(entry)
+        self._priorities.sort()
+        self._sorted = True
+
+    def __len__(self):
+        return len(self._flows)
+
+    def __iter__(self):
+        return iter(self._flows.values())
+
+    def __contains__(self, flow):
+        try:
+            found = self._flows.get((flow['node']['@id'], flow['name']))
+        except (KeyError, TypeError):
+            return False
+        return found == flow
+
+    def add(self, flow):
+        """Add a flow to the table, replacing any flow of the same name on
+           the same switch.
+        """
+        entry = self._index(flow)
+        if entry is not None:
+            bisect.insort(self._priorities, entry)
+
+    def _index(self, flow):
+        """Add a flow to every index but the priority one, and return its
+           entry for that, or None if it has no priority.
+        """
+        key = (flow['node']['@id'], flow['name'])
+        if key in self._flows:
+            self.remove(*key)
+        self._flows[key] = flow
+        self._by_node.setdefault(key[0], set()).add(key)
+        for field in self.fields:
+            value = _index_value(flow.get(field))
+            if value is not None:
+                self._by_field[field].setdefault(value, set()).add(key)
+        priority = _priority(flow)
+        if priority is None:
+            return None
+        return (priority, key)
+
+    def remove(self, node_id, flow_name):
+        """Remove a flow from the table, if it is there.
+        """
+        key = (node_id, flow_name)
+        flow = self._flows.pop(key, None)
+        if flow is None:
+            return
+        self._by_node[node_id].discard(key)
+        if not self._by_node[node_id]:
+            del self._by_node[node_id]
+        for field in self.fields:
+            value = _index_value(flow.get(field))
+            if value is not None:
+                keys = self._by_field[field][value]
+                keys.discard(key)
+                if not keys:
+                    del self._by_field[field][value]
+        priority = _priority(flow)
+        if priority is None:
+            pass
+        elif self._sorted:
+            i = bisect.bisect_left(self._priorities, (priority, key))
+            del self._priorities[i]
+        else:
+            self._priorities.remove((priority, key))
+
+    def get(self, node_id, flow_name):
+        """Return the named flow on a switch, or None.
+        """
+        return self._flows.get((node_id, flow_name))
+
+    def by_node(self, node_id):
+        """Return a list of the flows on a switch.
+        """
+        return [self._flows[key] for key in self._by_node.get(node_id, ())]
+
+    def filter(self, node_id=None, **fields):
+        """Return a list of the flows, optionally on just one switch, whose
+           fields have all the values given.
+        """
+        candidates = []
+        if node_id is not None:
+            candidates.append(self._by_node.get(node_id, set()))
+        unindexed = {}
+        for field, value in fields.items():
+            if field in self._by_field:
+                candidates.append(
+                        self._by_field[field].get(_index_value(value), set()))
+            else:
+                unindexed[field] = _index_value(value)
+
+        if candidates:
+            candidates.sort(key=len)
+            keys = candidates[0].intersection(*candidates[1:])
+        else:
+            keys = self._flows.keys()
+
+        found = []
+        for key in keys:
+            flow = self._flows[key]
+            if all(_index_value(flow.get(field)) == value
+                   for field, value in unindexed.items()):
+                found.append(flow)
+        return found
+
+    def priority_range(self, low, high, node_id=None):
+        """Return a list of the flows, optionally on just one switch, whose
+           priority is between low and high inclusive, lowest first.
+        """
+        start = bisect.bisect_left(self._priorities, (int(low),))
+        found = []
+        for priority, key in self._priorities[start:]:
+            if priority > int(high):
+                break
+            if node_id is None or key[0] == node_id:
+                found.append(self._flows[key])
+        return found
+
+
+def _canonical(value):
+    """Return value with every scalar in it turned into a stripped string,
+       the way the Controller hands values back, so that 500 and u'500 '
+       compare equal.
+    """
+    if isinstance(value, OpenDaylightCompactFlow):
+        value = value.to_dict()
+    if isinstance(value, dict):
+        return dict(('%s' % (k,), _canonical(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if value is None:
+        return None
+    return ('%s' % (value,)).strip()
+
+
+def _fingerprint(value):
+    """Return a short digest of the canonical form of value, which may be
+       a flowConfig or any other json-like thing.  Equal fingerprints mean
+       equal values, after _canonical().
+    """
+    text = json.dumps(_canonical(value), sort_keys=True,
+                      separators=(',', ':'))
+    return hashlib.sha1(text.encode('utf-8')).digest()
+
+
+def _index_value(value):
+    """Turn a flowConfig field value into something OpenDaylightFlowTable
+       can index, or None if it can't be.
+    """
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    return str(value)
+
+
+def _priority(flow):
+    """Return a flowConfig's priority as an int, or None.
+    """
+    try:
+        return int(flow['priority'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class OpenDaylightFlowAnalyzer(object):
+    """Finds flows that can never match a packet, or that disagree with
+       another flow about what to do with one, on each switch.
+
+       A flow covers another on the same switch if every match field it
+       sets is also set by the other with the same value, or for nwSrc and
+       nwDst, with an address inside its prefix.  A field left out matches
+       anything.  analyze() then reports:
+          shadowed    - covered by a flow of higher priority with different
+                        actions, so it never gets a packet
+          redundant   - covered by a flow with the same actions and a
+                        higher or equal priority, so it could be removed
+          conflicting - covered by a flow of the same priority with
+                        different actions, so which one wins is up to the
+                        switch
+       Flows that merely overlap, neither covering the other, aren't
+       reported.
+
+       Rather than comparing every pair, flows are indexed by the exact
+       set of match fields and values they have.  Each flow then looks up
+       the index once for each subset of its own match fields, which are
+       the only places a flow covering it can be.  That is 2**k lookups
+       for a flow setting k match fields, and more when it sets nwSrc or
+       nwDst, which each count once for every shorter prefix length in use
+       on the switch.  So the work is O(n * 2**k) for n flows: linear in
+       the number of flows, but doubling with every match field they set.
+    """
+
+    # flowConfig fields a packet is matched on
+    match_fields = ('ingressPort', 'etherType', 'vlanId', 'vlanPriority',
+                    'dlSrc', 'dlDst', 'nwSrc', 'nwDst', 'tosBits', 'protocol',
+                    'tpSrc', 'tpDst')
+
+    # match fields holding an IPv4 address or prefix
+    prefix_fields = ('nwSrc', 'nwDst')
+
+    # what an OpenFlow switch assumes when a flow gives no priority
+    default_priority = 32768
+
+    def __init__(self, flows=()):
+        """Optional argument:
+            flows    - an iterable of flowConfig dictionaries
+        """
+        # node_id -> match key -> ([-priority, ...], [entry, ...]) sorted
+        # by priority, highest first
+        self._index = {}
+        # node_id -> prefix field -> prefix lengths in use
+        self._lengths = {}
+        self._entries = []
+        for flow in flows:
+            entry = self._entry(flow)
+            self._entries.append(entry)
+            node_id = entry['node_id']
+            buckets = self._index.setdefault(node_id, {})
+            buckets.setdefault(entry['key'], []).append(entry)
+            lengths = self._lengths.setdefault(node_id, {})
+            for field, value in entry['key']:
+                if field in self.prefix_fields and value[1] is not None:
+                    lengths.setdefault(field, set()).add(value[1])
+        for buckets in self._index.values():
+            for key, bucket in buckets.items():
+                bucket.sort(key=lambda entry: -entry['priority'])
+                buckets[key] = ([-entry['priority'] for entry in bucket],
+                                bucket)
+
+    def _entry(self, flow):
+        """What the analyzer needs to know about one flow.
+        """
+        key = []
+        for field in self.match_fields:
+            if field in flow and flow[field] not in (None, ''):
+                key.append((field, _match_value(field, flow[field])))
+        priority = _priority(flow)
+        if priority is None:
+            priority = self.default_priority
+        actions = _canonical(flow.get('actions'))
+        if not isinstance(actions, list):
+            actions = [actions]
+        return {'node_id':_node_id(flow['node']), 'flow_name':flow['name'],
+                'key':tuple(key), 'priority':priority, 'actions':actions}
+
+    def _covering_keys(self, entry):
+        """Every match key that a flow covering entry could have.
+        """
+        keys = [()]
+        lengths = self._lengths.get(entry['node_id'], {})
+        for field, value in entry['key']:
+            choices = [None, (field, value)]
+            if field in self.prefix_fields and value[1] is not None:
+                choices = [None] + [(field, _ipv4_prefix(value[0], length))
+                                    for length in lengths.get(field, ())
+                                    if length <= value[1]]
+            keys = [key + (choice,) if choice is not None else key
+                    for key in keys for choice in choices]
+        return keys
+
+    def analyze(self):
+        """Return what was found, as a dictionary of lists of
+           {'node_id':..., 'flow_name':..., 'by':name of the covering flow}:
+              {'shadowed': [...], 'redundant': [...], 'conflicting': [...]}
+        """
+        report = {'shadowed':[], 'redundant':[], 'conflicting':[]}
+        for entry in self._entries:
+            buckets = self._index[entry['node_id']]
+            higher = None
+            same = []
+            for key in self._covering_keys(entry):
+                if key not in buckets:
+                    continue
+                priorities, bucket = buckets[key]
+                if bucket[0]['priority'] > entry['priority'] and (
+                        higher is None or
+                        bucket[0]['priority'] > higher['priority']):
+                    higher = bucket[0]
+                start = bisect.bisect_left(priorities, -entry['priority'])
+                end = bisect.bisect_right(priorities, -entry['priority'])
+                same.extend(other for other in bucket[start:end]
+                            if other is not entry)
+
+            kind = by = None
+            if higher is not None:
+                by = higher
+                if higher['actions'] == entry['actions']:
+                    kind = 'redundant'
+                else:
+                    kind = 'shadowed'
+            else:
+                for other in same:
+                    if other['actions'] != entry['actions']:
+                        kind, by = 'conflicting', other
+                        break
+                    # of two identical flows, only report one of them
+                    if other['key'] != entry['key'] or \
+                       other['flow_name'] < entry['flow_name']:
+                        kind, by = 'redundant', other
+            if kind is not None:
+                report[kind].append({'node_id':entry['node_id'],
+                                     'flow_name':entry['flow_name'],
+                                     'by':by['flow_name']})
+        return report
+
+
+def _match_value(field, value):
+    """A match field value in a form that compares equal when the switch
+       would treat it the same, so '0x800' and '0x0800' agree.  nwSrc and
+       nwDst become (network, prefix length), or (text, None) when they
+       aren't IPv4.
+    """
+    text = ('%s' % (value,)).strip().lower()
+    if field in OpenDaylightFlowAnalyzer.prefix_fields:
+        address, _, length = text.partition('/')
+        try:
+            octets = [int(octet) for octet in address.split('.')]
+            length = int(length) if length else 32
+            if len(octets) != 4 or not 0 <= length <= 32 or \
+               not all(0 <= octet <= 255 for octet in octets):
+                raise ValueError
+        except ValueError:
+            return (text, None)
+        number = 0
+        for octet in octets:
+            number = number * 256 + octet
+        return _ipv4_prefix(number, length)
+    try:
+        return int(text, 0)
+    except ValueError:
+        return text
+
+
+def _ipv4_prefix(number, length):
+    """(network, length) for an IPv4 address given as an int.
+    """
+    mask = (0xffffffff << (32 - length)) & 0xffffffff
+    return (number & mask, length)
+
+
+class OpenDaylightFlowTemplate(object):
+    """A recipe for a family of flowConfigs that are alike except for a
+       few fields, expanded lazily.  For example, a DROP flow for IPv4 and
+       IPv6 on each of 48 ports of two switches:
+
+           template = OpenDaylightFlowTemplate(
+               {'actions': 'DROP', 'installInHw': 'true',
+                'name': 'drop', 'priority': '500'},
+               node=[SWITCH_1, SWITCH_2],
+               ingressPort=range(1, 49),
+               etherType=['0x800', '0x86dd'])
+           results = flow.add_many(template)
+
+       Iterating over the template yields a new flowConfig dictionary for
+       every combination of the varying fields, one at a time, so it can be
+       handed straight to iadd_many() or add_many() however many flows it
+       describes.  The varying fields are walked in sorted order of their
+       names, so the same template always yields the same flows in the same
+       order.  Numbers are turned into strings the way the Controller
+       reports them, and a 'node' given as a dpid string becomes
+       {'@id': dpid, '@type': 'OF'}, in the shared fields as well as the
+       varying ones.
+
+       Each flow is named from the template's 'name' and its place in that
+       order ('drop-0', 'drop-1', ...), unless name is given as a format
+       string, such as 'drop-{ingressPort}-{etherType}', which is filled in
+       from the flow's varying fields ({node} being the dpid).  It is up to
+       you to make a format string give every flow a different name.
+    """
+
+    def __init__(self, flow, name=None, **fields):
+        """Mandatory argument:
+            flow     - a flowConfig dictionary holding the fields every flow
+                       shares, including 'name' unless name is given
+
+           Optional arguments:
+            name     - format string for flow names, as described above
+            fields   - the values of each field that varies: a sequence,
+                       a set (taken in sorted order), or a single value
+        """
+        if name is None and 'name' not in flow:
+            raise ValueError("a flow template needs a 'name' or name=")
+        if 'node' not in flow and 'node' not in fields:
+            raise ValueError("a flow template needs a 'node'")
+        self.flow = dict((field, _template_value(field, value))
+                         for field, value in flow.items())
+        self.name = name
+        self.fields = sorted(fields)
+        self._values = [_template_values(fields[field])
+                        for field in self.fields]
+
+    def __len__(self):
+        count = 1
+        for values in self._values:
+            count *= len(values)
+        return count
+
+    def __iter__(self):
+        # count through the combinations like an odometer, indexing into
+        # each sequence rather than copying it the way itertools.product
+        # would, so a range(1000000) costs nothing
+        digits = list(zip(self.fields, self._values))
+        digits.reverse()
+        count = len(self)
+        index = 0
+        while index < count:
+            flow = dict(self.flow)
+            remainder = index
+            for field, values in digits:
+                remainder, place = divmod(remainder, len(values))
+                flow[field] = _template_value(field, values[place])
+            if self.name is None:
+                flow['name'] = '%s-%d' % (self.flow['name'], index)
+            else:
+                flow['name'] = self.name.format(**dict(
+                    (field, _node_id(flow[field]) if field == 'node'
+                     else flow[field]) for field in self.fields))
+            yield flow
+            index += 1
+
+
+def _template_values(values):
+    """The values of a varying OpenDaylightFlowTemplate field as something
+       that can be indexed, in an order that doesn't change between runs.
+    """
+    if isinstance(values, _string_types + (bytes, dict)):
+        return (values,)
+    if isinstance(values, (set, frozenset)):
+        return tuple(sorted(values))
+    if hasattr(values, '__getitem__') and hasattr(values, '__len__'):
+        return values
+    if hasattr(values, '__iter__'):
+        return tuple(values)
+    return (values,)
+
+
+def _template_value(field, value):
+    """An OpenDaylightFlowTemplate value as it goes in a flowConfig.
+    """
+    if field == 'node':
+        if isinstance(value, dict):
+            return value
+        return {'@id': value, '@type': 'OF'}
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return str(value)
+    return value
+
+
+class OpenDaylightFlowValidator(object):
+    """Catches flows the Controller would turn away, before they are sent.
+
+       Every flow is checked for a name that can go in a url, a 'node' with
+       an '@id' and '@type', an OF dpid written as eight colon separated hex
+       bytes, and a priority from 0 to 65535 if it has one.  Given the
+       inventory from OpenDaylightNode.get_inventory() (or left in
+       OpenDaylightNode.inventory), it also checks that the switch is there
+       and, when its connectors were fetched, that it has the ingressPort.
+
+           node.get_inventory()
+           validator = OpenDaylightFlowValidator(node.inventory)
+           good, bad = validator.validate_many(my_flows)
+           results = flow.add_many(good) + bad
+
+       Nothing here talks to the Controller, so an inventory goes stale as
+       switches come and go; build a new validator when that matters.
+    """
+
+    _dpid = re.compile(r'^[0-9a-fA-F]{2}(:[0-9a-fA-F]{2}){7}$')
+
+    def __init__(self, inventory=None):
+        """Optional argument:
+            inventory - what OpenDaylightNode.get_inventory() returned
+        """
+        self.ports = None
+        if inventory is not None:
+            # dpid -> set of port ids, or None when connectors are unknown
+            self.ports = {}
+            for node in inventory['nodes']:
+                self.ports[_node_id(node['node'])] = None
+            for node_id, connectors in inventory['connectors'].items():
+                if isinstance(connectors, dict):
+                    connectors = [connectors]
+                self.ports[node_id] = set(
+                    str(connector['nodeconnector']['@id'])
+                    for connector in connectors or [])
+
+    def validate(self, flow):
+        """Return a list of what is wrong with flow, which is empty if
+           nothing is.
+        """
+        problems = []
+        name = flow.get('name') if hasattr(flow, 'get') else None
+        if not name or not isinstance(name, _string_types) or '/' in name:
+            problems.append('bad flow name %r' % (name,))
+        node = flow.get('node') if hasattr(flow, 'get') else None
+        if not hasattr(node, 'get') or not node.get('@id') or \
+           not node.get('@type'):
+            problems.append('flow %r has no node @id and @type' % (name,))
+            return problems
+        node_id = node['@id']
+        if node['@type'] == 'OF' and not self._dpid.match(node_id):
+            problems.append('bad switch dpid %r' % (node_id,))
+        if 'priority' in flow:
+            try:
+                if not 0 <= int(flow['priority']) <= 65535:
+                    raise ValueError
+            except (TypeError, ValueError):
+                problems.append('bad priority %r' % (flow['priority'],))
+
+        if self.ports is not None and not problems:
+            if node_id not in self.ports:
+                problems.append('no switch %s' % node_id)
+            elif 'ingressPort' in flow and self.ports[node_id] is not None \
+                    and str(flow['ingressPort']) not in self.ports[node_id]:
+                problems.append('no port %s on switch %s'
+                                % (flow['ingressPort'], node_id))
+        return problems
+
+    def validate_many(self, flows):
+        """Split flows into those that pass and those that don't, in one
+           pass, returning (good, bad).  good is a list of the flows that
+           passed, and bad a list of result dictionaries like the ones
+           OpenDaylightFlow.add_many() returns, with an http_code of None.
+        """
+        good = []
+        bad = []
+        for flow in flows:
+            problems = self.validate(flow)
+            if problems:
+                result = {'node_id':None, 'flow_name':None, 'http_code':None,
+                          'latency':0, 'error':'; '.join(problems)}
+                result.update(_flow_key(flow))
+                bad.append(result)
+            else:
+                good.append(flow)
+        return good, bad
+
+
+try:
+    _string_types = (str, unicode) #pylint: disable=E0602
+except NameError:
+    _string_types = (str,)
+
+try:
+    _intern = sys.intern
+except AttributeError:
+    def _intern(value):
+        """Python 2's intern(), which only takes byte strings, so unicode
+           ones are shared through a pool instead.
+        """
+        if isinstance(value, str):
+            return intern(value) #pylint: disable=E0602
+        return _shared(_unicode_pool, value)
+    _unicode_pool = {}
+
+
+def _flow_key(flow):
+    """As much of {'node_id':..., 'flow_name':...} as a flow that may be
+       malformed has.
+    """
+    key = {}
+    try:
+        key['flow_name'] = flow['name']
+        key['node_id'] = flow['node']['@id']
+    except (KeyError, TypeError):
+        pass
+    return key
+
+
+class OpenDaylightCompactFlow(object):
+    """A memory-lean, read-only stand-in for a flowConfig dictionary, for
+       holding very many flows at once.
+
+       Flows have the same handful of keys and mostly the same values
+       ('OF', 'DROP', '0x800', 'true', the same few dpids), so each one
+       keeps only a tuple of its values, shares its tuple of keys with
+       every other flow laid out the same way, and interns its strings.
+       For 100,000 flows like the ones in test-OpenDaylight.py spread over
+       20 switches, that is about 25MB instead of 89MB as the dictionaries
+       json hands back (Python 3.11, measured with tracemalloc).
+
+       It reads like the dictionary it came from, so flow['name'] and
+       flow['node']['@id'] work, and to_dict() gives back an equal
+       dictionary.  OpenDaylightFlow.add() and friends accept either.
+    """
+
+    __slots__ = ('_keys', '_values')
+
+    # every distinct tuple of keys seen so far, so that flows can share them
+    _layouts = {}
+
+    def __init__(self, flow):
+        """Mandatory argument:
+            flow     - a flowConfig dictionary
+        """
+        keys = tuple(_intern(key) for key in flow)
+        self._keys = _shared(self._layouts, keys)
+        self._values = tuple(_compact(flow[key]) for key in flow)
+
+    def __getitem__(self, key):
+        try:
+            return _expand(self._values[self._keys.index(key)])
+        except ValueError:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __eq__(self, other):
+        if isinstance(other, OpenDaylightCompactFlow):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'OpenDaylightCompactFlow(%r)' % (self.to_dict(),)
+
+    def get(self, key, default=None):
+        """Same as dict.get()
+        """
+        if key in self._keys:
+            return self[key]
+        return default
+
+    def keys(self):
+        """Same as dict.keys()
+        """
+        return list(self._keys)
+
+    def items(self):
+        """Same as dict.items()
+        """
+        return [(key, _expand(value))
+                for key, value in zip(self._keys, self._values)]
+
+    def to_dict(self):
+        """Return the flowConfig dictionary this was made from.
+        """
+        return dict(self.items())
+
+
+class _CompactList(tuple):
+    """A list inside an OpenDaylightCompactFlow."""
+    __slots__ = ()
+
+
+class _CompactDict(tuple):
+    """A dictionary inside an OpenDaylightCompactFlow, held as a tuple of
+       its keys followed by a tuple of its values."""
+    __slots__ = ()
+
+
+# key tuples and nested dictionaries of strings (mostly 'node') are shared
+# between flows just like strings are
+_compact_pool = {}
+
+# most entries _shared() keeps in a pool before starting it afresh
+_POOL_LIMIT = 65536
+
+
+def _shared(pool, value):
+    """The copy of value kept in pool, keeping this one if there is none.
+    """
+    if len(pool) >= _POOL_LIMIT:
+        # flows from ever more switches mustn't grow a pool forever;
+        # starting over only costs some sharing
+        pool.clear()
+    return pool.setdefault(value, value)
+
+
+def _compact(value):
+    """Turn a json value into its OpenDaylightCompactFlow form.
+    """
+    if isinstance(value, _string_types):
+        return _intern(value)
+    if isinstance(value, list):
+        return _CompactList(_compact(v) for v in value)
+    if isinstance(value, dict):
+        keys = tuple(_intern(key) for key in value)
+        values = tuple(_compact(value[key]) for key in value)
+        compact = _CompactDict((_shared(_compact_pool, keys), values))
+        # only strings are shared: tuples compare True == 1 == 1.0, so
+        # sharing anything else could hand one flow another's value
+        if all(isinstance(v, _string_types) for v in values):
+            compact = _shared(_compact_pool, compact)
+        return compact
+    return value
+
+
+def _expand(value):
+    """Undo _compact()
+    """
+    if isinstance(value, _CompactList):
+        return [_expand(v) for v in value]
+    if isinstance(value, _CompactDict):
+        return dict(zip(value[0], [_expand(v) for v in value[1]]))
+    return value
 
 
 #pylint: disable=R0921
@@ -259,6 +2823,13 @@ class OpenDaylightNode(object):
        OpenDaylightNode.node_connectors holds a dictionary that corresponds to
        the 'nodeConnectors' element in the OpenDaylight REST API.  
 
+       OpenDaylightNode.inventory holds the result of the last
+       get_inventory(), which see.
+
+       As with OpenDaylightFlow, the call_*() methods do the same jobs as
+       their namesakes but return an OpenDaylightResult rather than
+       touching shared state, so are safe to use from several threads.
+
        Note that we don't statically define what those fields are contained
        in the 'nodes' or 'nodeConnectors' elements here in this object.  
     """
@@ -275,12 +2846,15 @@ class OpenDaylightNode(object):
         self.__app = 'switch'
         self.nodes = None
         self.node_connectors = None
+        self.inventory = None
         self.request = None
 
-    def get_nodes(self):
+    def get_nodes(self, timeout=None):
         """Get information about Nodes on the Controller and stuffs the
            result into the OpenDaylightNode.notes dictionary.
 
+            Optional Arguments:
+                timeout     -   seconds to wait, overriding setup['timeout']
         """
         if hasattr(self, 'request'):
             del self.request
@@ -288,23 +2862,41 @@ class OpenDaylightNode(object):
             del self.nodes
 
         self.odl.prepare(self.__app, '/nodes/')
-        self.request = requests.get(url=self.odl.url, auth=self.odl.auth)
+        result = _call_get(self.odl, self.__app, '/nodes/', 'get_nodes',
+                           'nodeProperties', timeout)
+        self.request = result.response
 
-        if self.request.status_code == 200:
-            self.nodes = self.request.json()
-            if 'nodeProperties' in self.nodes:
-                self.nodes = self.nodes.get('nodeProperties')
+        if result.status == 200:
+            self.nodes = result.data
         else:
-            raise OpenDaylightError({'url':self.odl.url, 
-                                     'http_code':self.request.status_code,
-                                     'msg':self.request.text})
+            raise OpenDaylightError(_result_error(result))
 
-    def get_node_connectors(self, node_id):
+    def call_get_nodes(self, timeout=None):
+        """Same as get_nodes(), but returns an OpenDaylightResult whose data
+           is what get_nodes() would have put in OpenDaylightNode.nodes, and
+           leaves this object and the OpenDaylight object alone.
+        """
+        return _check_result(_call_get(self.odl, self.__app, '/nodes/',
+                                       'get_nodes', 'nodeProperties',
+                                       timeout), 200)
+
+    def iter_nodes(self):
+        """Yield the Nodes on the Controller one at a time, as they are read
+           off the wire.  See OpenDaylightFlow.iter_flows() for why you
+           might want this instead of get_nodes().
+        """
+        return _iter_response(self.odl, self.__app, 'get_nodes', '/nodes/',
+                              'nodeProperties')
+
+    def get_node_connectors(self, node_id, timeout=None):
         """Get information about NodeConnectors on the Controller and stuffs the
            result into the OpenDaylightNode.node_connectors dictionary.
 
             Mandatory Arguments: 
                 node_id     -   returns flows just for that switch dpid
+
+            Optional Arguments:
+                timeout     -   seconds to wait, overriding setup['timeout']
         """
 
         if hasattr(self, 'request'):
@@ -313,34 +2905,118 @@ class OpenDaylightNode(object):
             del self.node_connectors
 
         self.odl.prepare(self.__app, '/node/' + 'OF/' + node_id + '/')
-        self.request = requests.get(url=self.odl.url, auth=self.odl.auth)
-        if self.request.status_code == 200:
-            self.node_connectors = self.request.json()
-            if 'nodeConnectorProperties' in self.node_connectors:
-                self.node_connectors = self.node_connectors.get(
-                                        'nodeConnectorProperties')
+        result = self._call_get_node_connectors(node_id, timeout)
+        self.request = result.response
+        if result.status == 200:
+            self.node_connectors = result.data
         else:
-            raise OpenDaylightError({'url':self.odl.url, 
-                                     'http_code':self.request.status_code,
-                                     'msg':self.request.text})
+            raise OpenDaylightError(_result_error(result))
+
+    def call_get_node_connectors(self, node_id, timeout=None):
+        """Same as get_node_connectors(), but returns an OpenDaylightResult
+           whose data is what get_node_connectors() would have put in
+           OpenDaylightNode.node_connectors, and leaves this object and the
+           OpenDaylight object alone.
+        """
+        return _check_result(self._call_get_node_connectors(node_id, timeout),
+                             200)
 
-    def save(self):
+    def _call_get_node_connectors(self, node_id, timeout):
+        """call_get_node_connectors() without the status check.
+        """
+        return _call_get(self.odl, self.__app,
+                         '/node/' + 'OF/' + node_id + '/',
+                         'get_node_connectors', 'nodeConnectorProperties',
+                         timeout)
+
+    def get_inventory(self, max_workers=8, timeout=None):
+        """Get every Node on the Controller along with its NodeConnectors,
+           fetching connectors for up to max_workers Nodes at once, and
+           stuff the result into OpenDaylightNode.inventory as well as
+           returning it:
+              {'nodes':      what get_nodes() leaves in
+                             OpenDaylightNode.nodes,
+               'connectors': {node_id: what get_node_connectors(node_id)
+                              leaves in OpenDaylightNode.node_connectors},
+               'errors':     {node_id: what went wrong fetching its
+                              connectors}}
+
+           A Node whose connectors can't be fetched turns up in 'errors'
+           rather than 'connectors', and the rest of the crawl carries on.
+           Failing to get the Nodes themselves raises OpenDaylightError just
+           as get_nodes() does.
+
+            Optional Arguments:
+                max_workers -   most connector requests to have in flight
+                timeout     -   seconds to wait for each request, overriding
+                                setup['timeout']
+        """
+        self.inventory = None
+        self.get_nodes(timeout)
+        nodes = self.nodes
+        if isinstance(nodes, dict):
+            nodes = [nodes]
+        nodes = nodes or []
+
+        def fetch(node_id):
+            """One Node's connectors, or what went wrong."""
+            try:
+                result = self._call_get_node_connectors(node_id, timeout)
+            except Exception as err: #pylint: disable=W0703
+                url = self.odl.build_url(self.__app,
+                                         '/node/' + 'OF/' + node_id + '/')
+                return node_id, None, {'url':url, 'http_code':None,
+                                       'msg':repr(err)}
+            if result.status != 200:
+                return node_id, None, _result_error(result)
+            return node_id, result.data, None
+
+        inventory = {'nodes':nodes, 'connectors':{}, 'errors':{}}
+        node_ids = [_node_id(node['node']) for node in nodes]
+        for node_id, connectors, error in _run_bulk(fetch, node_ids,
+                                                    max_workers):
+            if error is None:
+                inventory['connectors'][node_id] = connectors
+            else:
+                inventory['errors'][node_id] = error
+        self.inventory = inventory
+        return inventory
+
+    def save(self, timeout=None):
         """Save current switch configurations
 
            The REST API documentation says:
             "Save the current switch configurations", but I am not sure what
             that actually means.  If you think you do, then here you go.
+
+            Optional Arguments:
+                timeout     -   seconds to wait, overriding setup['timeout']
         """
 
         if hasattr(self, 'request'):
             del self.request
 
         self.odl.prepare(self.__app, '/switch-config/')
-        self.request = requests.post(url=self.odl.url, auth=self.odl.auth)
-        if self.request.status_code != 200:
-            raise OpenDaylightError({'url':self.odl.url, 
-                                     'http_code':self.request.status_code,
-                                     'msg':self.request.text})
+        result = self._call_save(timeout)
+        self.request = result.response
+        if result.status != 200:
+            raise OpenDaylightError(_result_error(result))
+
+    def call_save(self, timeout=None):
+        """Same as save(), but returns an OpenDaylightResult and leaves this
+           object and the OpenDaylight object alone.
+        """
+        return _check_result(self._call_save(timeout), 200)
+
+    def _call_save(self, timeout):
+        """call_save() without the status check.
+        """
+        url = self.odl.build_url(self.__app, '/switch-config/')
+        start = time.time()
+        response = self.odl.send('POST', url, self.odl.build_auth(), timeout,
+                                 app=self.__app, op='save')
+        return OpenDaylightResult(None, response.status_code,
+                                  time.time() - start, url, response)
 
     def delete_node_property(self):
         """Delete a property of a Node on the Controller
@@ -363,6 +3039,955 @@ class OpenDaylightNode(object):
         raise NotImplementedError("add_node_connector_property()")
 
 
+class OpenDaylightStatistics(object):
+    """A way to talk to the OpenDaylight Statistics REST API
+
+       OpenDaylightStatistics.odl holds an OpenDaylight object containing
+       details on how to communicate with the controller.
+
+       OpenDaylightStatistics.request holds a Requests object for the REST
+       session, just as OpenDaylightNode.request does.
+
+       OpenDaylightStatistics.port_statistics holds what the last
+       get_port_statistics() found.  For one Node that is a list of its
+       'portStatistic' elements, each with a 'nodeConnector' and counters
+       such as 'receiveBytes' and 'transmitPackets'.  For every Node it is
+       a list of {'node':..., 'portStatistic':[...]}, one per Node.
+
+       OpenDaylightStatistics.flow_statistics does the same for
+       get_flow_statistics() and the 'flowStatistic' elements, which hold
+       a 'flow' along with its 'packetCount', 'byteCount' and so on.
+
+       As with OpenDaylightNode, the call_*() methods do the same jobs as
+       their namesakes but return an OpenDaylightResult rather than
+       touching shared state, so are safe to use from several threads.
+    """
+
+    def __init__(self, odl):
+        """Mandatory argument:
+            odl - an OpenDaylight object
+        """
+        self.odl = odl
+        self.__app = 'statistics'
+        self.port_statistics = None
+        self.flow_statistics = None
+        self.request = None
+
+    def get_port_statistics(self, node_id=None, timeout=None):
+        """Get the port counters on the Controller and stuffs the result
+           into OpenDaylightStatistics.port_statistics.
+
+            Optional Arguments:
+                node_id     -   returns counters just for that switch dpid
+                timeout     -   seconds to wait, overriding setup['timeout']
+        """
+        if hasattr(self, 'request'):
+            del self.request
+        if hasattr(self, 'port_statistics'):
+            del self.port_statistics
+
+        self.odl.prepare(self.__app, _statistics_path('port', node_id)[0])
+        result = self._call_get_statistics('port', node_id, timeout)
+        self.request = result.response
+        if result.status == 200:
+            self.port_statistics = result.data
+        else:
+            raise OpenDaylightError(_result_error(result))
+
+    def call_get_port_statistics(self, node_id=None, timeout=None):
+        """Same as get_port_statistics(), but returns an OpenDaylightResult
+           whose data is what get_port_statistics() would have put in
+           OpenDaylightStatistics.port_statistics, and leaves this object and
+           the OpenDaylight object alone.
+        """
+        return _check_result(self._call_get_statistics('port', node_id,
+                                                       timeout), 200)
+
+    def get_flow_statistics(self, node_id=None, timeout=None):
+        """Get the flow counters on the Controller and stuffs the result
+           into OpenDaylightStatistics.flow_statistics.
+
+            Optional Arguments:
+                node_id     -   returns counters just for that switch dpid
+                timeout     -   seconds to wait, overriding setup['timeout']
+        """
+        if hasattr(self, 'request'):
+            del self.request
+        if hasattr(self, 'flow_statistics'):
+            del self.flow_statistics
+
+        self.odl.prepare(self.__app, _statistics_path('flow', node_id)[0])
+        result = self._call_get_statistics('flow', node_id, timeout)
+        self.request = result.response
+        if result.status == 200:
+            self.flow_statistics = result.data
+        else:
+            raise OpenDaylightError(_result_error(result))
+
+    def call_get_flow_statistics(self, node_id=None, timeout=None):
+        """Same as get_flow_statistics(), but returns an OpenDaylightResult
+           whose data is what get_flow_statistics() would have put in
+           OpenDaylightStatistics.flow_statistics, and leaves this object and
+           the OpenDaylight object alone.
+        """
+        return _check_result(self._call_get_statistics('flow', node_id,
+                                                       timeout), 200)
+
+    def _call_get_statistics(self, kind, node_id, timeout):
+        """call_get_port_statistics() or call_get_flow_statistics() without
+           the status check.
+        """
+        path, key = _statistics_path(kind, node_id)
+        return _call_get(self.odl, self.__app, path,
+                         'get_' + kind + '_statistics', key, timeout)
+
+
+def _statistics_path(kind, node_id):
+    """(path, key to unwrap) for the 'port' or 'flow' statistics of one
+       Node, or of every Node when node_id is None.
+    """
+    if node_id is None:
+        return '/' + kind + '/', kind + 'Statistics'
+    return '/' + kind + '/node/' + 'OF/' + node_id + '/', kind + 'Statistic'
+
+
+_NAN = float('nan')
+
+
+class OpenDaylightPortSampler(object):
+    """Samples the port counters of every Node on the Controller into fixed
+       size ring buffers, and works out rates and percentiles across all of
+       the ports at once.
+
+       Each sample() fetches the port statistics of every Node in one
+       request, and writes the counters named in
+       OpenDaylightPortSampler.counters for each (node_id, connector_id)
+       into the next of size slots.  The samples are doubles in
+       preallocated flat arrays, a row of size slots per port, so memory
+       only grows when a port is first seen and a week of sampling costs no
+       more than a minute of it.  Thousands of ports at the defaults take
+       a few megabytes.
+
+       If NumPy can be imported the rows are one NumPy array, and rates()
+       and percentiles() subtract, divide and sort every port's samples in
+       a handful of array operations.  Without NumPy the rows are
+       array.array('d') and the same sums are done by stepping through a
+       slice of each array.
+
+       A port missing from a sample, or whose counter went backwards since
+       the earlier one (the switch restarted, or the counter wrapped), has
+       no rate: rates() gives None for it and percentiles() leaves it out.
+       OpenDaylightPortSampler.ports lists the (node_id, connector_id) of
+       every port seen, in the order they were first seen.
+    """
+
+    counters = ('receivePackets', 'transmitPackets', 'receiveBytes',
+                'transmitBytes', 'receiveDrops', 'transmitDrops',
+                'receiveErrors', 'transmitErrors')
+
+    def __init__(self, odl, size=60, counters=None, use_numpy=None):
+        """Mandatory argument:
+            odl       - an OpenDaylight object
+
+           Optional arguments:
+            size      - samples to keep for each port
+            counters  - names of the 'portStatistic' counters to keep,
+                        OpenDaylightPortSampler.counters by default
+            use_numpy - True to insist on NumPy, False to do without it;
+                        by default it is used if it can be imported
+        """
+        self.statistics = OpenDaylightStatistics(odl)
+        self.size = size
+        if counters is not None:
+            self.counters = tuple(counters)
+        self.samples = 0
+        self.ports = []
+        self._rows = {}
+        self._numpy = None
+        if use_numpy is not False:
+            try:
+                import numpy
+                self._numpy = numpy
+            except ImportError:
+                if use_numpy:
+                    raise
+        self._times = array.array('d', [_NAN]) * size
+        self._data = None
+        self._capacity = 0
+        self._grow(64)
+        self._lock = threading.Lock()
+
+    def sample(self, timeout=None):
+        """Fetch every port's counters into the next slot, overwriting the
+           oldest sample once the buffers are full, and return how many
+           ports were sampled.  Raises OpenDaylightError if the Controller
+           can't say.
+
+            Optional Arguments:
+                timeout     -   seconds to wait, overriding setup['timeout']
+        """
+        result = self.statistics.call_get_port_statistics(timeout=timeout)
+        when = time.time()
+        nodes = result.data
+        if isinstance(nodes, dict):
+            nodes = [nodes]
+
+        rows = []
+        columns = [[] for _ in self.counters]
+        with self._lock:
+            for node in nodes or []:
+                ports = node.get('portStatistic') or []
+                if isinstance(ports, dict):
+                    ports = [ports]
+                for port in ports:
+                    connector = port['nodeConnector']
+                    rows.append(self._row((_node_id(connector['node']),
+                                           _node_id(connector))))
+                    for column, counter in zip(columns, self.counters):
+                        value = port.get(counter)
+                        column.append(_NAN if value is None else float(value))
+            slot = self.samples % self.size
+            self._store(slot, rows, columns)
+            self._times[slot] = when
+            self.samples += 1
+        return len(rows)
+
+    def rates(self, counter='receiveBytes', window=1):
+        """Return {(node_id, connector_id): counter per second} for every
+           port, over the last window samples.  A port's rate is None when
+           it has none (see above), and every rate is None until there have
+           been more than window samples.
+        """
+        with self._lock:
+            rates = self._rates(counter, window)
+            ports = list(self.ports)
+        if rates is None:
+            return dict.fromkeys(ports)
+        return dict((port, None if math.isnan(rate) else float(rate))
+                    for port, rate in zip(ports, rates))
+
+    def percentiles(self, counter='receiveBytes', pcts=(50, 90, 99),
+                    window=1):
+        """Return {pct: rate} for each of pcts, the nearest rank percentiles
+           of the rates() across every port that has one.  Each is None
+           when no port has a rate yet.
+        """
+        with self._lock:
+            rates = self._rates(counter, window)
+        result = dict.fromkeys(pcts)
+        if rates is None:
+            return result
+        if self._numpy is not None:
+            rates = self._numpy.sort(rates[~self._numpy.isnan(rates)])
+        else:
+            rates = sorted(rate for rate in rates if not math.isnan(rate))
+        if not len(rates):
+            return result
+        for pct in pcts:
+            result[pct] = float(rates[int(round(pct / 100.0 *
+                                                (len(rates) - 1)))])
+        return result
+
+    def series(self, node_id, connector_id, counter='receiveBytes'):
+        """Return [(time, value), ...] for the samples still held for one
+           port, oldest first, leaving out those the port was missing from.
+        """
+        with self._lock:
+            row = self._rows.get((node_id, connector_id))
+            if row is None:
+                return []
+            index = self.counters.index(counter)
+            held = min(self.samples, self.size)
+            series = []
+            for sample in range(self.samples - held, self.samples):
+                slot = sample % self.size
+                if self._numpy is not None:
+                    value = float(self._data[index, row, slot])
+                else:
+                    value = self._data[index][row * self.size + slot]
+                if not math.isnan(value):
+                    series.append((self._times[slot], value))
+        return series
+
+    def _row(self, port):
+        """The row holding port's samples, making one if it is new.
+        """
+        row = self._rows.get(port)
+        if row is None:
+            row = len(self.ports)
+            if row == self._capacity:
+                self._grow(2 * self._capacity)
+            self._rows[port] = row
+            self.ports.append(port)
+        return row
+
+    def _grow(self, capacity):
+        """Make room for capacity ports; new rows have no samples.
+        """
+        if self._numpy is not None:
+            data = self._numpy.empty((len(self.counters), capacity,
+                                      self.size))
+            data.fill(_NAN)
+            if self._data is not None:
+                data[:, :self._capacity] = self._data
+            self._data = data
+        else:
+            if self._data is None:
+                self._data = [array.array('d') for _ in self.counters]
+            blank = array.array('d', [_NAN]) * \
+                    ((capacity - self._capacity) * self.size)
+            for data in self._data:
+                data.extend(blank)
+        self._capacity = capacity
+
+    def _store(self, slot, rows, columns):
+        """Write one sample: columns[i][j] is counter i of port rows[j].
+           Every other port is marked missing in this slot.
+        """
+        if self._numpy is not None:
+            self._data[:, :, slot] = _NAN
+            if rows:
+                self._data[:, rows, slot] = columns
+            return
+        # each port's value for this slot is every size'th double
+        blank = array.array('d', [_NAN]) * self._capacity
+        for data, column in zip(self._data, columns):
+            data[slot::self.size] = blank
+            for row, value in zip(rows, column):
+                data[row * self.size + slot] = value
+
+    def _rates(self, counter, window):
+        """Every port's rate over the last window samples, in row order,
+           as a NumPy array or an array.array with NaN where there is none,
+           or None if there aren't enough samples yet.
+        """
+        if not 0 < window < self.size:
+            raise ValueError('window must be from 1 to size - 1 samples')
+        index = self.counters.index(counter)
+        if self.samples <= window:
+            return None
+        latest = (self.samples - 1) % self.size
+        earlier = (self.samples - 1 - window) % self.size
+        elapsed = self._times[latest] - self._times[earlier]
+        if elapsed <= 0:
+            return None
+        count = len(self.ports)
+
+        if self._numpy is not None:
+            data = self._data[index, :count]
+            delta = data[:, latest] - data[:, earlier]
+            with self._numpy.errstate(invalid='ignore'):
+                delta[delta < 0] = _NAN
+            return delta / elapsed
+
+        data = self._data[index]
+        stop = count * self.size
+        rates = array.array('d', [_NAN]) * count
+        for row, (now, then) in enumerate(zip(data[latest:stop:self.size],
+                                              data[earlier:stop:self.size])):
+            delta = now - then
+            # False for NaN, so missing samples stay NaN
+            if delta >= 0:
+                rates[row] = delta / elapsed
+        return rates
+
+
+class OpenDaylightPoller(object):
+    """Watches the Controller for changes to Nodes, NodeConnectors and
+       flows, and tells registered callbacks only about what changed.
+
+       Each poll crawls the inventory with OpenDaylightNode.get_inventory()
+       and streams the flows with OpenDaylightFlow.iter_flows(), keeping
+       just a fingerprint of each entity from the last poll.  When anything
+       was added, removed or changed, every callback is called with a
+       dictionary like:
+          {'nodes':      {'added':[...], 'removed':[...], 'changed':[...]},
+           'connectors': {'added':[...], 'removed':[...], 'changed':[...]},
+           'flows':      {'added':[...], 'removed':[...], 'changed':[...]}}
+       'added' and 'changed' hold the entities as the Controller returned
+       them.  Since only fingerprints are kept, 'removed' holds keys: a
+       dpid for a Node, (dpid, connector id) for a NodeConnector and (dpid,
+       flow name) for a flow.  The first poll reports everything as added.
+
+       When running in the background with start(), the time between
+       polls halves after a poll that found changes and grows by half after
+       one that didn't, staying between min_interval and max_interval
+       seconds.  OpenDaylightPoller.interval holds the current value.
+    """
+
+    def __init__(self, odl, min_interval=1.0, max_interval=60.0,
+                 max_workers=8):
+        """Mandatory argument:
+            odl          - an OpenDaylight object
+
+           Optional arguments:
+            min_interval - shortest seconds between polls
+            max_interval - longest seconds between polls
+            max_workers  - most requests in flight during a poll
+        """
+        self.node = OpenDaylightNode(odl)
+        self.flow = OpenDaylightFlow(odl)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_workers = max_workers
+        self.interval = min_interval
+        self.last_error = None
+        self._callbacks = []
+        self._seen = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def register(self, callback):
+        """Call callback(changes) after every poll that finds changes.
+        """
+        self._callbacks.append(callback)
+
+    def poll(self):
+        """Poll the Controller once, call the callbacks if anything changed,
+           and return the changes (or None if there were none).
+        """
+        inventory = self.node.get_inventory(self.max_workers)
+
+        current = {'nodes':{}, 'connectors':{}, 'flows':{}}
+        entities = {'nodes':{}, 'connectors':{}, 'flows':{}}
+
+        def note(kind, key, entity):
+            """Fingerprint an entity, and keep it if it is new or changed."""
+            fingerprint = _fingerprint(entity)
+            current[kind][key] = fingerprint
+            if self._seen is None or \
+               self._seen[kind].get(key) != fingerprint:
+                entities[kind][key] = entity
+
+        for node in inventory['nodes']:
+            note('nodes', _node_id(node['node']), node)
+        for node_id, connectors in inventory['connectors'].items():
+            if isinstance(connectors, dict):
+                connectors = [connectors]
+            for connector in connectors or []:
+                note('connectors',
+                     (node_id, _node_id(connector['nodeconnector'])),
+                     connector)
+        # don't report a Node's connectors as gone just because fetching
+        # them failed this time
+        if self._seen is not None:
+            for key, fingerprint in self._seen['connectors'].items():
+                if key[0] in inventory['errors']:
+                    current['connectors'][key] = fingerprint
+        for flow in self.flow.iter_flows():
+            note('flows', (flow['node']['@id'], flow['name']), flow)
+
+        changes = {}
+        found = False
+        for kind in current:
+            before = {}
+            if self._seen is not None:
+                before = self._seen[kind]
+            changes[kind] = {
+                'added':[entity for key, entity in entities[kind].items()
+                         if key not in before],
+                'changed':[entity for key, entity in entities[kind].items()
+                           if key in before],
+                'removed':[key for key in before
+                           if key not in current[kind]]}
+            found = found or any(changes[kind].values())
+        self._seen = current
+
+        if not found:
+            return None
+        for callback in self._callbacks:
+            callback(changes)
+        return changes
+
+    def start(self):
+        """Poll in a background thread until stop() is called.  If a poll
+           raises, the exception is kept in OpenDaylightPoller.last_error
+           and polling carries on.
+        """
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling in the background, waiting for any poll under way.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        """Background polling loop.
+        """
+        while not self._stop.is_set():
+            changed = False
+            try:
+                changed = self.poll() is not None
+                self.last_error = None
+            except Exception as err: #pylint: disable=W0703
+                self.last_error = err
+            if changed:
+                self.interval = max(self.min_interval, self.interval / 2.0)
+            else:
+                self.interval = min(self.max_interval, self.interval * 1.5)
+            self._stop.wait(self.interval)
+
+
+class OpenDaylightCluster(object):
+    """A set of Controllers sharing the work of one network, where each
+       switch is mastered by just one of them.
+
+       OpenDaylightCluster.controllers holds an OpenDaylight object for
+       each Controller.  Switches are assigned to Controllers with a
+       consistent hash ring, so every client agrees on which Controller
+       owns which dpid.  Marking a Controller down moves only its switches,
+       spread over the others, and marking it up again moves them back.
+       Use OpenDaylightClusterFlow and OpenDaylightClusterNode to talk to
+       the cluster the way you would use OpenDaylightFlow and
+       OpenDaylightNode with a single Controller.
+    """
+
+    def __init__(self, setups, replicas=100):
+        """Mandatory argument:
+            setups   - a list of dictionaries, one per Controller, each
+                       holding whichever OpenDaylight.setup values differ
+                       from the defaults, e.g. [{'hostname':'10.10.10.1'},
+                       {'hostname':'10.10.10.2'}]
+
+           Optional argument:
+            replicas - points each Controller gets on the hash ring.  More
+                       spreads switches more evenly.
+        """
+        self.controllers = []
+        for setup in setups:
+            odl = OpenDaylight()
+            odl.setup.update(setup)
+            self.controllers.append(odl)
+        self._down = set()
+        self._ring = []
+        for i, odl in enumerate(self.controllers):
+            name = odl.setup['hostname'] + ':' + odl.setup['port']
+            for replica in range(replicas):
+                self._ring.append((_ring_hash(name + '#' + str(replica)), i))
+        self._ring.sort()
+
+    def controller_for(self, node_id):
+        """Return the OpenDaylight object for the Controller that owns a
+           switch dpid, skipping any that are marked down.
+        """
+        start = bisect.bisect(self._ring, (_ring_hash(node_id), -1))
+        for i in range(len(self._ring)):
+            index = self._ring[(start + i) % len(self._ring)][1]
+            if index not in self._down:
+                return self.controllers[index]
+        raise OpenDaylightError({'url':None, 'http_code':None,
+                                 'msg':'No controllers are up'})
+
+    def live(self):
+        """Return a list of the Controllers not marked down.
+        """
+        return [odl for i, odl in enumerate(self.controllers)
+                if i not in self._down]
+
+    def mark_down(self, odl):
+        """Stop sending anything to a Controller, given its OpenDaylight
+           object.
+        """
+        self._down.add(self.controllers.index(odl))
+
+    def mark_up(self, odl):
+        """Start sending to a Controller again.
+        """
+        self._down.discard(self.controllers.index(odl))
+
+    def fan_out(self, call):
+        """Call call(odl) for every live Controller in parallel, and return
+           a list of what each returned.  If any raises, so does this.
+        """
+        live = self.live()
+        if not live:
+            raise OpenDaylightError({'url':None, 'http_code':None,
+                                     'msg':'No controllers are up'})
+        executor = ThreadPoolExecutor(max_workers=len(live))
+        try:
+            return list(executor.map(call, live))
+        finally:
+            executor.shutdown(wait=True)
+
+    def close(self):
+        """Close the connection pools to every Controller.
+        """
+        for odl in self.controllers:
+            odl.close()
+
+
+class OpenDaylightClusterFlow(object):
+    """OpenDaylightFlow for an OpenDaylightCluster.  Calls about one
+       switch go to the Controller that owns it, and controller-wide calls
+       go to every live Controller at once, with the results merged.
+
+       OpenDaylightClusterFlow.flows is filled in just as for
+       OpenDaylightFlow.  OpenDaylightClusterFlow.request holds the
+       response for calls that went to one Controller, and is None after a
+       controller-wide get().
+    """
+
+    def __init__(self, cluster):
+        """Mandatory argument:
+            cluster  - an OpenDaylightCluster object
+        """
+        self.cluster = cluster
+        self.request = None
+        self.flows = None
+        self._clients = {}
+
+    def _client(self, odl):
+        """Return the OpenDaylightFlow for one Controller.
+        """
+        if odl not in self._clients:
+            self._clients[odl] = OpenDaylightFlow(odl)
+        return self._clients[odl]
+
+    def get(self, node_id=None, flow_name=None, timeout=None):
+        """Same as OpenDaylightFlow.get()
+        """
+        self.request = None
+        self.flows = None
+        if node_id is not None:
+            client = self._client(self.cluster.controller_for(node_id))
+            try:
+                client.get(node_id, flow_name, timeout)
+            finally:
+                self.request = client.request
+            self.flows = client.flows
+            return
+
+        def fetch(odl):
+            """One Controller's flows."""
+            client = self._client(odl)
+            client.get(timeout=timeout)
+            return client.flows
+        self.flows = []
+        for flows in self.cluster.fan_out(fetch):
+            if isinstance(flows, dict):
+                flows = [flows]
+            self.flows.extend(flows or [])
+
+    def add(self, flow, timeout=None):
+        """Same as OpenDaylightFlow.add()
+        """
+        client = self._client(self.cluster.controller_for(flow['node']['@id']))
+        try:
+            client.add(flow, timeout)
+        finally:
+            self.request = client.request
+
+    def delete(self, node_id, flow_name, timeout=None):
+        """Same as OpenDaylightFlow.delete()
+        """
+        client = self._client(self.cluster.controller_for(node_id))
+        try:
+            client.delete(node_id, flow_name, timeout)
+        finally:
+            self.request = client.request
+
+    def add_many(self, flows, max_workers=8, timeout=None):
+        """Same as OpenDaylightFlow.add_many(), with each flow sent to the
+           Controller that owns its switch.
+        """
+        return list(self.iadd_many(flows, max_workers, timeout))
+
+    def iadd_many(self, flows, max_workers=8, timeout=None):
+        """Same as OpenDaylightFlow.iadd_many(), with each flow sent to the
+           Controller that owns its switch.
+        """
+        def add_one(flow):
+            """Route one flow."""
+            try:
+                odl = self.cluster.controller_for(flow['node']['@id'])
+            except (KeyError, TypeError, OpenDaylightError) as err:
+                return {'node_id':None, 'flow_name':None, 'http_code':None,
+                        'latency':0, 'error':repr(err)}
+            return self._client(odl)._add_one(flow, timeout)
+        return _run_bulk(add_one, flows, max_workers)
+
+    def delete_many(self, flows, max_workers=8, timeout=None):
+        """Same as OpenDaylightFlow.delete_many(), with each flow deleted
+           from the Controller that owns its switch.
+        """
+        return list(self.idelete_many(flows, max_workers, timeout))
+
+    def idelete_many(self, flows, max_workers=8, timeout=None):
+        """Same as OpenDaylightFlow.idelete_many(), with each flow deleted
+           from the Controller that owns its switch.
+        """
+        def delete_one(pair):
+            """Route one flow."""
+            try:
+                odl = self.cluster.controller_for(pair[0])
+            except OpenDaylightError as err:
+                return {'node_id':pair[0], 'flow_name':pair[1],
+                        'http_code':None, 'latency':0, 'error':repr(err)}
+            return self._client(odl)._delete_one(pair, timeout)
+        return _run_bulk(delete_one, flows, max_workers)
+
+
+class OpenDaylightClusterNode(object):
+    """OpenDaylightNode for an OpenDaylightCluster, routed the same way as
+       OpenDaylightClusterFlow.
+    """
+
+    def __init__(self, cluster):
+        """Mandatory argument:
+            cluster  - an OpenDaylightCluster object
+        """
+        self.cluster = cluster
+        self.request = None
+        self.nodes = None
+        self.node_connectors = None
+        self._clients = {}
+
+    def _client(self, odl):
+        """Return the OpenDaylightNode for one Controller.
+        """
+        if odl not in self._clients:
+            self._clients[odl] = OpenDaylightNode(odl)
+        return self._clients[odl]
+
+    def get_nodes(self, timeout=None):
+        """Same as OpenDaylightNode.get_nodes(), merged across every live
+           Controller, with each switch listed once.
+        """
+        self.request = None
+        self.nodes = None
+
+        def fetch(odl):
+            """One Controller's nodes."""
+            client = self._client(odl)
+            client.get_nodes(timeout)
+            return client.nodes
+        # a switch may be known to more than one Controller, so only keep
+        # the first report of each
+        self.nodes = []
+        seen = set()
+        for nodes in self.cluster.fan_out(fetch):
+            if isinstance(nodes, dict):
+                nodes = [nodes]
+            for node in nodes or []:
+                key = _fingerprint(node.get('node'))
+                if key not in seen:
+                    seen.add(key)
+                    self.nodes.append(node)
+
+    def get_node_connectors(self, node_id, timeout=None):
+        """Same as OpenDaylightNode.get_node_connectors()
+        """
+        self.node_connectors = None
+        client = self._client(self.cluster.controller_for(node_id))
+        try:
+            client.get_node_connectors(node_id, timeout)
+        finally:
+            self.request = client.request
+        self.node_connectors = client.node_connectors
+
+    def save(self, timeout=None):
+        """Same as OpenDaylightNode.save(), on every live Controller.
+        """
+        self.request = None
+        self.cluster.fan_out(lambda odl: self._client(odl).save(timeout))
+
+
+def _auth_key(auth):
+    """Something hashable that tells apart the credentials in auth.
+    """
+    if hasattr(auth, 'username'):
+        return (auth.username, auth.password)
+    return auth
+
+
+def _call_get(odl, app, path, op, key, timeout):
+    """GET a REST query and return an OpenDaylightResult whose data is the
+       decoded json, unwrapped from key when it is there.
+    """
+    url = odl.build_url(app, path)
+    start = time.time()
+    response = odl.send('GET', url, odl.build_auth(), timeout, app=app, op=op)
+    data = None
+    if response.status_code == 200:
+        data = response.json()
+        if key in data:
+            data = data.get(key)
+    return OpenDaylightResult(data, response.status_code,
+                              time.time() - start, url, response)
+
+
+def _result_error(result):
+    """The dictionary OpenDaylightError wants for a failed call.
+    """
+    return {'url':result.url, 'http_code':result.status,
+            'msg':result.response.text}
+
+
+def _check_result(result, expect):
+    """Return result if its status is expect, else raise OpenDaylightError.
+    """
+    if result.status != expect:
+        raise OpenDaylightError(_result_error(result))
+    return result
+
+
+def _open_snapshot(path, mode):
+    """Open a dump() snapshot file, gzip compressed if path ends in '.gz'.
+    """
+    if path.endswith('.gz'):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+
+def _node_id(node):
+    """Return the dpid from the 'node' element of a Node, NodeConnector
+       or flowConfig, whichever way the Controller spelled it.
+    """
+    if '@id' in node:
+        return node['@id']
+    return node['id']
+
+
+def _ring_hash(key):
+    """Place a key on the OpenDaylightCluster hash ring.
+    """
+    return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:16], 16)
+
+
+def _run_bulk(worker, items, max_workers):
+    """Call worker() on each of items using a pool of max_workers threads,
+       yielding the return values in the same order as items.
+
+       items is consumed lazily: no more than 2 * max_workers of them are
+       submitted ahead of the results handed back to the caller.
+    """
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(worker, item))
+            if len(pending) >= 2 * max_workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # if the caller gave up on us early, don't send what is left
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
+
+
+def _iter_response(odl, app, op, path, key):
+    """GET a REST query and yield each element of the array under key in
+       the json response, reading the response as a stream.
+    """
+    url = odl.build_url(app, path)
+    response = odl.send('GET', url, odl.build_auth(), app=app, op=op,
+                        stream=True)
+    try:
+        if response.status_code != 200:
+            raise OpenDaylightError({'url':url,
+                                     'http_code':response.status_code,
+                                     'msg':response.text})
+        for element in _iter_json_array(response.iter_content(65536), key):
+            yield element
+    finally:
+        response.close()
+
+
+def _iter_json_array(chunks, key):
+    """Yield the elements of the array stored under key in a json object
+       that arrives as an iterable of byte strings, without holding more
+       than one element (and one chunk) in memory.
+
+       The Controller writes a single element as a bare object rather than
+       an array of one, so that is handled too.  If key never shows up,
+       nothing is yielded.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    chunks = iter(chunks)
+    buf = ''
+    pos = 0
+    eof = False
+
+    def more(buf, pos):
+        """Read another chunk onto what is left of buf."""
+        for chunk in chunks:
+            if chunk:
+                return buf[pos:] + utf8.decode(chunk), 0, False
+        return buf[pos:] + utf8.decode(b'', True), 0, True
+
+    # find the start of the value under key: the key in quotes, followed
+    # by a colon so that a string value that happens to match is skipped
+    marker = '"' + key + '"'
+    while True:
+        found = buf.find(marker, pos)
+        if found < 0:
+            if eof:
+                return
+            # keep enough of the tail to catch a marker split between chunks
+            pos = max(pos, len(buf) - len(marker))
+            buf, pos, eof = more(buf, pos)
+            continue
+        after = found + len(marker)
+        while after < len(buf) and buf[after] in ' \t\r\n':
+            after += 1
+        if after == len(buf) and not eof:
+            buf, pos, eof = more(buf, found)
+            continue
+        if after < len(buf) and buf[after] == ':':
+            pos = after
+            break
+        pos = found + 1
+
+    in_array = None
+    while True:
+        while pos < len(buf) and buf[pos] in ' \t\r\n:,':
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                raise ValueError('json ended before the ' + key + ' array')
+            buf, pos, eof = more(buf, pos)
+            continue
+
+        if in_array is None:
+            if buf[pos] == '[':
+                in_array = True
+                pos += 1
+                continue
+            in_array = False
+        elif buf[pos] == ']':
+            return
+
+        try:
+            element, end = decoder.raw_decode(buf, pos)
+        except ValueError:
+            if eof:
+                raise
+            buf, pos, eof = more(buf, pos)
+            continue
+        if end == len(buf) and not eof:
+            # a number cut off by the end of a chunk still decodes, as
+            # the start of itself
+            buf, pos, eof = more(buf, pos)
+            continue
+        pos = end
+        if in_array:
+            yield element
+        else:
+            # a lone element, or null when there are none at all
+            if element is not None:
+                yield element
+            return
+
+
 class OpenDaylightError(Exception):
     """OpenDaylight Exception Class
     """
@@ -0,0 +1,209 @@
+"""
+asyncio interface to the OpenDaylight REST API
+
+Copyright 2013 The University of Wisconsin Board of Regents
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+
+This mirrors OpenDaylightFlow and OpenDaylightNode for code running on an
+asyncio event loop.  It needs Python 3.5 or later and aiohttp, which is why
+it lives apart from OpenDaylight.py.  A quick example:
+
+    odl = OpenDaylight()
+    odl.setup['hostname'] = '10.10.10.1'
+
+    async with AsyncOpenDaylight(odl) as aodl:
+        flow = AsyncOpenDaylightFlow(aodl)
+        node = AsyncOpenDaylightNode(aodl)
+        nodes = await node.get_nodes()
+        await asyncio.gather(*[flow.add(f) for f in my_flows])
+
+Since one client may have any number of calls outstanding at once, results
+are returned rather than stored on the object the way the blocking API does.
+"""
+
+import json
+import aiohttp
+from OpenDaylight import OpenDaylightError
+
+
+class AsyncOpenDaylight(object):
+    """An aiohttp session for talking to the controller described by an
+       OpenDaylight object.  URLs and credentials come from
+       OpenDaylight.setup, just as they do for OpenDaylight.prepare(), and
+       are looked up on every call so changes to setup take effect.
+
+       AsyncOpenDaylight.limit caps how many connections to the controller
+       may be open at once; calls beyond that wait their turn for a free one.
+    """
+
+    def __init__(self, odl, limit=100):
+        """Mandatory argument:
+            odl      - an OpenDaylight object
+
+           Optional argument:
+            limit    - most connections to keep open to the controller
+        """
+        self.odl = odl
+        self.limit = limit
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    @property
+    def session(self):
+        """The aiohttp session, built on first use so that it belongs to
+           the running event loop.
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.limit)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def close(self):
+        """Close every connection to the controller.
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def request(self, method, app, path, expect, body=None):
+        """Send one REST query and return the text of the response.
+
+           Arguments:
+            'method' - http verb to use
+            'app'    - which OpenDaylight northbound api component
+                       (application) we want to talk to.
+            'path'   - the specific rest query for the application.
+            'expect' - the http status code that means success; anything
+                       else raises OpenDaylightError.
+            'body'   - optional dictionary to send as json.
+        """
+        url = self.odl.build_url(app, path)
+        auth = aiohttp.BasicAuth(self.odl.setup['username'],
+                                 self.odl.setup['password'])
+        headers = None
+        data = None
+        if body is not None:
+            headers = {'Content-type': 'application/json'}
+            data = json.dumps(body)
+
+        async with self.session.request(method, url, auth=auth, data=data,
+                                        headers=headers) as response:
+            text = await response.text()
+            if response.status != expect:
+                raise OpenDaylightError({'url':url,
+                                         'http_code':response.status,
+                                         'msg':text})
+        return text
+
+    async def get(self, app, path):
+        """Send a GET query expecting a 200 and return the decoded json.
+        """
+        return json.loads(await self.request('GET', app, path, 200))
+
+
+class AsyncOpenDaylightFlow(object):
+    """asyncio version of OpenDaylightFlow.  Each method returns what the
+       blocking version would have left in OpenDaylightFlow.flows.
+    """
+
+    def __init__(self, aodl):
+        """Mandatory argument:
+            aodl     - an AsyncOpenDaylight object
+        """
+        self.aodl = aodl
+        self.__app = 'flow'
+
+    async def get(self, node_id=None, flow_name=None):
+        """Return the flows specified on the Controller.
+
+             Optional Arguments:
+                node_id     -   returns flows just for that switch dpid
+                flow_name   -   returns the specifically named flow on that switch
+        """
+        if node_id is None:
+            path = '/'
+        elif flow_name is None:
+            path = '/' + 'OF/' + node_id + '/'
+        else:
+            path = '/' + 'OF/' + node_id + '/' + flow_name + '/'
+
+        flows = await self.aodl.get(self.__app, path)
+        if 'flowConfig' in flows:
+            flows = flows.get('flowConfig')
+        return flows
+
+    async def add(self, flow):
+        """Given a dictionary corresponding to a flowConfig, add this flow to
+           the Controller.
+        """
+        await self.aodl.request('POST', self.__app,
+                                '/' + flow['node']['@type'] + '/' +
+                                flow['node']['@id'] + '/' + flow['name'] + '/',
+                                201, body=flow)
+
+    async def delete(self, node_id, flow_name):
+        """Delete a flow to a Node on the Controller
+
+           Mandatory Arguments:
+              node_id     -   the switch dpid
+              flow_name   -   the specifically named flow on that switch
+        """
+        await self.aodl.request('DELETE', self.__app,
+                                '/' + 'OF/' + node_id + '/' + flow_name + '/',
+                                200)
+
+
+class AsyncOpenDaylightNode(object):
+    """asyncio version of OpenDaylightNode.  Each method returns what the
+       blocking version would have left in OpenDaylightNode.nodes or
+       OpenDaylightNode.node_connectors.
+    """
+
+    def __init__(self, aodl):
+        """Mandatory argument:
+            aodl     - an AsyncOpenDaylight object
+        """
+        self.aodl = aodl
+        self.__app = 'switch'
+
+    async def get_nodes(self):
+        """Return information about Nodes on the Controller.
+        """
+        nodes = await self.aodl.get(self.__app, '/nodes/')
+        if 'nodeProperties' in nodes:
+            nodes = nodes.get('nodeProperties')
+        return nodes
+
+    async def get_node_connectors(self, node_id):
+        """Return information about NodeConnectors on the Controller.
+
+            Mandatory Arguments:
+                node_id     -   returns connectors just for that switch dpid
+        """
+        connectors = await self.aodl.get(self.__app,
+                                         '/node/' + 'OF/' + node_id + '/')
+        if 'nodeConnectorProperties' in connectors:
+            connectors = connectors.get('nodeConnectorProperties')
+        return connectors
+
+    async def save(self):
+        """Save current switch configurations
+        """
+        await self.aodl.request('POST', self.__app, '/switch-config/', 200)
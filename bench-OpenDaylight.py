@@ -0,0 +1,466 @@
+#!/usr/bin/python
+"""
+Benchmarks for the OpenDaylight REST API interface
+
+Copyright 2013 The University of Wisconsin Board of Regents
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+
+Unlike test-OpenDaylight.py, this needs no controller or Mininet.  It starts
+a stand-in for the 'flow', 'switch' and 'statistics' northbound applications
+on localhost, with as much artificial latency as you like, and times
+OpenDaylightFlow, OpenDaylightNode and OpenDaylightStatistics calls against it
+across flow counts and concurrency levels.
+Results are written as json so runs can be compared over time:
+
+    ./bench-OpenDaylight.py --flows 100,1000 --concurrency 1,8,32 \
+                            --latency 0.002 --output results.json
+
+Give --transport requests,http.client to compare the transports.  For each
+one, the time a fresh interpreter takes to import OpenDaylight.py and make
+a single call is measured too, as 'startup'.
+
+The stand-in only knows enough of the REST API to answer this library; it is
+not a controller simulator.
+"""
+
+from __future__ import print_function
+import argparse
+import json
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+from OpenDaylight import OpenDaylight
+from OpenDaylight import OpenDaylightFlow
+from OpenDaylight import OpenDaylightNode
+from OpenDaylight import OpenDaylightStatistics
+
+SWITCH_1 = '99:99:99:00:00:00:01:00'
+PORTS = 48
+# counters in a stand-in 'portStatistic', and how much port 1's grows on
+# each statistics query; port n's grows n times as much
+PORT_COUNTERS = [('receivePackets', 10), ('transmitPackets', 20),
+                 ('receiveBytes', 1000), ('transmitBytes', 2000),
+                 ('receiveDrops', 0), ('transmitDrops', 0),
+                 ('receiveErrors', 0), ('transmitErrors', 0)]
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers the REST queries OpenDaylight.py makes, from the flows and
+       nodes held by the StandInController it belongs to.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # headers and body go out in separate writes, which Nagle would stall
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def reply(self, code, body=''):
+        """Send a response, json encoding body unless it is a string.
+        """
+        if not isinstance(body, str):
+            body = json.dumps(body)
+        data = body.encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def route(self):
+        """Sleep for the configured latency, then return the path after
+           the container as a list, along with the application name.
+        """
+        time.sleep(self.server.latency)
+        path = self.path[len(self.server.path):].strip('/').split('/')
+        return path[0], path[2:]
+
+    def fault(self):
+        """Count the request, and act out the next of the controller's
+           faults if there are any.  Returns True if that took care of the
+           request.
+        """
+        controller = self.server
+        with controller.lock:
+            controller.hits[self.command] = \
+                controller.hits.get(self.command, 0) + 1
+            controller.last_headers = self.headers
+            if not controller.faults:
+                return False
+            delay, status = controller.faults.popleft()
+        time.sleep(delay)
+        if status == 'drop':
+            # hang up without a word, as a Controller that fell over would
+            self.close_connection = True
+            return True
+        if status is not None:
+            self.reply(status, 'Injected fault')
+            return True
+        return False
+
+    def do_GET(self):
+        """flow: list all, list a switch, get one.  switch: list nodes,
+           list a node's connectors.  statistics: port or flow counters for
+           every node or one.
+        """
+        app, path = self.route()
+        if self.fault():
+            return
+        controller = self.server
+        with controller.lock:
+            if app == 'statistics':
+                return self.statistics(path)
+            if app == 'flow' and not path:
+                return self.reply(200, {'flowConfig':
+                    [f for flows in controller.flows.values()
+                     for f in flows.values()]})
+            if app == 'flow' and len(path) in (2, 3):
+                if path[1] not in controller.nodes:
+                    return self.reply(404, 'Node not found')
+                flows = controller.flows.get(path[1], {})
+                if len(path) == 2:
+                    return self.reply(200,
+                                      {'flowConfig': list(flows.values())})
+                if path[2] not in flows:
+                    return self.reply(404, 'Flow not found')
+                return self.reply(200, flows[path[2]])
+            if app == 'switch' and path == ['nodes']:
+                return self.reply(200, {'nodeProperties':
+                    [{'node': {'@id': n, '@type': 'OF'}, 'properties': {}}
+                     for n in controller.nodes]})
+            if app == 'switch' and len(path) == 3 and path[0] == 'node':
+                if path[2] not in controller.nodes:
+                    return self.reply(404, 'Node not found')
+                node = {'@id': path[2], '@type': 'OF'}
+                return self.reply(200, {'nodeConnectorProperties':
+                    [{'nodeconnector': {'node': node, '@id': str(port),
+                                        '@type': 'OF'},
+                      'properties': {}}
+                     for port in controller.nodes[path[2]]]})
+        self.reply(404, 'Not found')
+
+    def statistics(self, path):
+        """Answer a statistics query.  Every port's counters go up by a
+           fixed amount per port on each query, so rates are predictable.
+        """
+        controller = self.server
+        if path and path[0] in ('port', 'flow') and len(path) in (1, 4):
+            node_ids = list(controller.nodes)
+            if len(path) == 4:
+                if path[3] not in controller.nodes:
+                    return self.reply(404, 'Node not found')
+                node_ids = [path[3]]
+            controller.samples += 1
+            kind = path[0]
+            answer = []
+            for node_id in node_ids:
+                node = {'id': node_id, 'type': 'OF'}
+                if kind == 'port':
+                    stats = []
+                    for port in controller.nodes[node_id]:
+                        stat = dict((counter, controller.samples * port * step)
+                                    for counter, step in PORT_COUNTERS)
+                        stat['nodeConnector'] = {'node': node,
+                                                 'id': str(port),
+                                                 'type': 'OF'}
+                        stats.append(stat)
+                else:
+                    stats = [{'flow': f, 'tableId': 0,
+                              'packetCount': controller.samples,
+                              'byteCount': controller.samples * 64}
+                             for f in controller.flows.get(node_id,
+                                                           {}).values()]
+                answer.append({'node': node, kind + 'Statistic': stats})
+            if len(path) == 4:
+                return self.reply(200, answer[0])
+            return self.reply(200, {kind + 'Statistics': answer})
+        self.reply(404, 'Not found')
+
+    def do_POST(self):
+        """flow: add one.  switch: save.
+        """
+        app, path = self.route()
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        if self.fault():
+            return
+        controller = self.server
+        if app == 'switch' and path == ['switch-config']:
+            return self.reply(200)
+        if app != 'flow' or len(path) != 3:
+            return self.reply(404, 'Not found')
+        with controller.lock:
+            if path[1] not in controller.nodes:
+                return self.reply(404, 'Node not found')
+            flows = controller.flows.setdefault(path[1], {})
+            if path[2] in flows:
+                return self.reply(409, 'Flow already exists')
+            flows[path[2]] = json.loads(body.decode('utf-8'))
+        self.reply(201, 'Success')
+
+    def do_DELETE(self):
+        """flow: delete one.
+        """
+        app, path = self.route()
+        if self.fault():
+            return
+        controller = self.server
+        if app != 'flow' or len(path) != 3:
+            return self.reply(404, 'Not found')
+        with controller.lock:
+            if controller.flows.get(path[1], {}).pop(path[2], None) is None:
+                return self.reply(404, 'Flow not found')
+        self.reply(200)
+
+
+class StandInController(ThreadingMixIn, HTTPServer):
+    """A local stand-in for the Controller's northbound REST API.
+
+       StandInController.nodes maps each switch dpid to a list of its port
+       numbers, and StandInController.flows maps each dpid to a dictionary
+       of its flows by name.  StandInController.samples counts the
+       statistics queries answered.  Every request sleeps for latency
+       seconds before it is answered.
+
+       StandInController.hits counts the requests received by http
+       method, and StandInController.last_headers holds the headers of the
+       latest one.  StandInController.faults is a deque of (delay, status)
+       for the tests to misbehave with: each request takes the next one,
+       waits delay more seconds, and is answered with status instead, or
+       as usual if status is None, or not at all if status is 'drop'.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(self, latency=0.0, nodes=None, port=0):
+        HTTPServer.__init__(self, ('127.0.0.1', port), StandInHandler)
+        self.latency = latency
+        self.path = '/controller/nb/v2/'
+        self.lock = threading.Lock()
+        if nodes is None:
+            nodes = {SWITCH_1: list(range(1, PORTS + 1))}
+        self.nodes = nodes
+        self.flows = {}
+        self.samples = 0
+        self.hits = {}
+        self.last_headers = None
+        self.faults = deque()
+        self._thread = None
+
+    def handle_error(self, request, client_address):
+        """Ignore clients that hang up early, which hedged GETs do.
+        """
+        if not isinstance(sys.exc_info()[1], socket.error):
+            HTTPServer.handle_error(self, request, client_address)
+
+    def start(self):
+        """Serve requests on a background thread.
+        """
+        self._thread = threading.Thread(target=self.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving and close the listening socket.
+        """
+        self.shutdown()
+        self.server_close()
+
+    def odl(self, transport='requests'):
+        """Return an OpenDaylight object pointed at this stand-in.
+        """
+        odl = OpenDaylight()
+        odl.setup['hostname'] = self.server_address[0]
+        odl.setup['port'] = str(self.server_address[1])
+        odl.setup['transport'] = transport
+        return odl
+
+
+def make_flow(i, node_id=SWITCH_1):
+    """Return the i'th benchmark flow, shaped like the ones in
+       test-OpenDaylight.py.
+    """
+    return {'actions': 'DROP',
+            'etherType': '0x800',
+            'ingressPort': str(i % PORTS + 1),
+            'installInHw': 'true',
+            'name': 'bench-flow-%d' % i,
+            'node': {'@id': node_id, '@type': 'OF'},
+            'priority': '500'}
+
+
+def percentile(samples, pct):
+    """Return the pct'th percentile of a sorted list, nearest rank.
+    """
+    if not samples:
+        return None
+    rank = int(round(pct / 100.0 * (len(samples) - 1)))
+    return samples[rank]
+
+
+def run(controller, op, items, concurrency, transport='requests'):
+    """Call op(flow, node, item) for every item, spread over concurrency
+       threads, each with its own OpenDaylight, OpenDaylightFlow and
+       OpenDaylightNode.  Returns (wall seconds, sorted call latencies).
+    """
+    items = list(items)
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(chunk):
+        odl = controller.odl(transport)
+        odl.setup['pool_size'] = 1
+        flow = OpenDaylightFlow(odl)
+        node = OpenDaylightNode(odl)
+        mine = []
+        for item in chunk:
+            start = time.time()
+            op(flow, node, item)
+            mine.append(time.time() - start)
+        odl.close()
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=worker,
+                                args=(items[i::concurrency],))
+               for i in range(concurrency)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+    latencies.sort()
+    return elapsed, latencies
+
+
+# run by startup() in a fresh interpreter
+STARTUP = """
+from OpenDaylight import OpenDaylight, OpenDaylightNode
+odl = OpenDaylight()
+odl.setup['hostname'], odl.setup['port'], odl.setup['transport'] = %r
+OpenDaylightNode(odl).get_nodes()
+"""
+
+
+def startup(controller, transport, repeat=5):
+    """Return the median seconds a fresh interpreter takes to import
+       OpenDaylight.py and make one call with transport.
+    """
+    code = STARTUP % ((controller.server_address[0],
+                       str(controller.server_address[1]), transport),)
+    samples = []
+    for _ in range(repeat):
+        start = time.time()
+        subprocess.check_call([sys.executable, '-c', code])
+        samples.append(time.time() - start)
+    samples.sort()
+    return percentile(samples, 50)
+
+
+# name -> (function doing one call, function giving the items to call it on)
+OPERATIONS = [
+    ('add', lambda flow, node, f: flow.add(f),
+     lambda n: [make_flow(i) for i in range(n)]),
+    ('get', lambda flow, node, f: flow.get(SWITCH_1, f['name']),
+     lambda n: [make_flow(i) for i in range(n)]),
+    ('get_switch', lambda flow, node, i: flow.get(SWITCH_1),
+     lambda n: range(max(10, n // 100))),
+    ('get_nodes', lambda flow, node, i: node.get_nodes(),
+     range),
+    ('port_stats', lambda flow, node, i:
+     OpenDaylightStatistics(node.odl).call_get_port_statistics(),
+     lambda n: range(max(10, n // 100))),
+    ('delete', lambda flow, node, f: flow.delete(SWITCH_1, f['name']),
+     lambda n: [make_flow(i) for i in range(n)]),
+]
+
+
+def main():
+    """Run every operation for each flow count and concurrency level.
+    """
+    parser = argparse.ArgumentParser(description='Benchmark OpenDaylight.py '
+                                     'against a local stand-in controller.')
+    parser.add_argument('--flows', default='100,1000',
+                        help='comma separated flow counts (default %(default)s)')
+    parser.add_argument('--concurrency', default='1,8,32',
+                        help='comma separated thread counts '
+                             '(default %(default)s)')
+    parser.add_argument('--transport', default='requests',
+                        help='comma separated transports, requests and/or '
+                             'http.client (default %(default)s)')
+    parser.add_argument('--latency', type=float, default=0.001,
+                        help='seconds the stand-in waits before each reply '
+                             '(default %(default)s)')
+    parser.add_argument('--output', default='bench-OpenDaylight.json',
+                        help='where to write results (default %(default)s)')
+    args = parser.parse_args()
+
+    controller = StandInController(latency=args.latency)
+    controller.start()
+    results = []
+    try:
+        for transport in args.transport.split(','):
+            result = {'op': 'startup',
+                      'transport': transport,
+                      'seconds': startup(controller, transport)}
+            results.append(result)
+            print('%(transport)-11s %(op)-11s %(seconds).4fs' % result)
+            for count in [int(c) for c in args.flows.split(',')]:
+                for concurrency in [int(c)
+                                    for c in args.concurrency.split(',')]:
+                    for name, op, items in OPERATIONS:
+                        calls = items(count)
+                        elapsed, latencies = run(controller, op, calls,
+                                                 concurrency, transport)
+                        result = {'op': name,
+                                  'transport': transport,
+                                  'flows': count,
+                                  'concurrency': concurrency,
+                                  'calls': len(latencies),
+                                  'seconds': elapsed,
+                                  'throughput': len(latencies) / elapsed,
+                                  'p50': percentile(latencies, 50),
+                                  'p99': percentile(latencies, 99)}
+                        results.append(result)
+                        print('%(transport)-11s %(op)-11s flows=%(flows)-6d '
+                              'concurrency=%(concurrency)-3d '
+                              '%(throughput)9.1f calls/s  '
+                              'p50=%(p50).4fs  p99=%(p99).4fs' % result)
+    finally:
+        controller.stop()
+
+    with open(args.output, 'w') as output:
+        json.dump({'time': time.time(),
+                   'python': platform.python_version(),
+                   'latency': args.latency,
+                   'results': results}, output, indent=2)
+    print('Results written to ' + args.output)
+
+
+if __name__ == '__main__':
+    main()
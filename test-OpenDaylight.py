@@ -25,12 +25,43 @@ This material is based upon work supported by the National Science
 Foundation under Grant No. 1247322
 """
 
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
 import time
 import unittest
 from OpenDaylight import OpenDaylight
+from OpenDaylight import OpenDaylightCluster
+from OpenDaylight import OpenDaylightClusterFlow
+from OpenDaylight import OpenDaylightClusterNode
 from OpenDaylight import OpenDaylightFlow
+from OpenDaylight import OpenDaylightCompactFlow
+from OpenDaylight import OpenDaylightFlowAnalyzer
+from OpenDaylight import OpenDaylightFlowCache
+from OpenDaylight import OpenDaylightFlowQueue
+from OpenDaylight import OpenDaylightFlowTemplate
+from OpenDaylight import OpenDaylightFlowValidator
+from OpenDaylight import OpenDaylightInstrumentation
+from OpenDaylight import OpenDaylightLimiter
 from OpenDaylight import OpenDaylightNode
+from OpenDaylight import OpenDaylightPoller
+from OpenDaylight import OpenDaylightPortSampler
+from OpenDaylight import OpenDaylightStatistics
 from OpenDaylight import OpenDaylightError
+# the streaming json parser behind iter_flows() and iter_nodes(), tested on
+# its own since a real Controller decides where its chunks break
+from OpenDaylight import _iter_json_array
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+# the benchmark's stand-in controller, for testing how send() copes with a
+# Controller that misbehaves, which a real one won't do on demand
+StandInController = __import__('bench-OpenDaylight').StandInController
 from mininet.net import Mininet
 #from mininet.util import dumpNodeConnections
 #from mininet.log import setLogLevel
@@ -80,6 +111,42 @@ class TestSequenceFunctions(unittest.TestCase):
            u'node': {u'@id': self.switch_id_1, u'@type': u'OF'},
            u'priority': u'500'}
 
+    def add_test_flows(self):
+        """Put both sample flows on the controller, for a test that needs
+           them whatever the tests before it left behind.
+        """
+        self.remove_test_flows()
+        self.flow.add(self.odl_test_flow_1)
+        self.flow.add(self.odl_test_flow_2)
+
+    def stand_in(self, **kwargs):
+        """Start a StandInController for just this test.
+        """
+        controller = StandInController(**kwargs)
+        controller.start()
+        self.addCleanup(controller.stop)
+        return controller
+
+    def cluster_of_stand_ins(self, nodes):
+        """Start a StandInController for each dictionary of nodes, and
+           return them along with an OpenDaylightCluster of them.
+        """
+        controllers = [self.stand_in(nodes=n) for n in nodes]
+        cluster = OpenDaylightCluster(
+            [{'hostname':c.server_address[0],
+              'port':str(c.server_address[1])} for c in controllers])
+        self.addCleanup(cluster.close)
+        return controllers, cluster
+
+    def remove_test_flows(self):
+        """Delete both sample flows, if they are there.
+        """
+        for flow in (self.odl_test_flow_1, self.odl_test_flow_2):
+            try:
+                self.flow.delete(flow['node']['@id'], flow['name'])
+            except OpenDaylightError:
+                pass
+
 
     def test_01_delete_flows(self):
         """Clean up from any previous test run, just delete these
@@ -97,6 +164,115 @@ class TestSequenceFunctions(unittest.TestCase):
         except:
             pass
 
+    def test_05_flow_template(self):
+        """Expand a template into the two sample flows, with names given
+           by a format string.
+        """
+        template = OpenDaylightFlowTemplate({u'actions': u'DROP',
+                                             u'etherType': u'0x800',
+                                             u'installInHw': u'true',
+                                             u'priority': u'500'},
+                                            name=u'odl-test-flow{ingressPort}',
+                                            node=[self.switch_id_1],
+                                            ingressPort=range(1, 3))
+        self.assertEqual(len(template), 2)
+        self.assertEqual(list(template),
+                         [self.odl_test_flow_1, self.odl_test_flow_2])
+
+        # the same, with the switch shared rather than varying, and the
+        # numbers left as numbers
+        template = OpenDaylightFlowTemplate({u'actions': u'DROP',
+                                             u'etherType': u'0x800',
+                                             u'installInHw': True,
+                                             u'name': u'odl-test-flow',
+                                             u'node': self.switch_id_1,
+                                             u'priority': 500},
+                                            name=u'odl-test-flow{ingressPort}',
+                                            ingressPort=range(1, 3))
+        self.assertEqual(list(template),
+                         [self.odl_test_flow_1, self.odl_test_flow_2])
+
+        # a set is taken in sorted order, and a string or number is one
+        # value, not a sequence of characters
+        template = OpenDaylightFlowTemplate({u'actions': u'DROP',
+                                             u'installInHw': u'true',
+                                             u'priority': u'500'},
+                                            name=u'odl-test-{etherType}',
+                                            node=self.switch_id_1,
+                                            ingressPort=1,
+                                            etherType={u'0x86dd', u'0x800'})
+        flows = list(template)
+        self.assertEqual(len(template), 2)
+        self.assertEqual([f['name'] for f in flows],
+                         [u'odl-test-0x800', u'odl-test-0x86dd'])
+        self.assertEqual(flows[0], dict(self.odl_test_flow_1,
+                                        name=u'odl-test-0x800'))
+        self.assertEqual(flows[1]['node'],
+                         {u'@id': self.switch_id_1, u'@type': u'OF'})
+
+    def test_05_compact_flow(self):
+        """A compact flow reads like the flowConfig it was made from and
+           turns back into an equal one, values of every json type intact
+           even when they compare equal to another flow's.
+        """
+        compact = OpenDaylightCompactFlow(self.odl_test_flow_1)
+        self.assertEqual(compact['node']['@id'], self.switch_id_1)
+        self.assertEqual(compact.to_dict(), self.odl_test_flow_1)
+        self.assertEqual(compact, OpenDaylightCompactFlow(self.odl_test_flow_1))
+
+        for value in (1, True, 1.0, 0, False, None, u'1', [1, True]):
+            flow = dict(self.odl_test_flow_2, extra={u'k': value})
+            expanded = OpenDaylightCompactFlow(flow).to_dict()
+            self.assertEqual(expanded, flow)
+            self.assertTrue(type(expanded[u'extra'][u'k']) is type(value))
+
+    def test_05_iter_json_array(self):
+        """Elements come out whole however the json is split into chunks.
+        """
+        def parse(text, key, size):
+            """Feed text to the parser size bytes at a time."""
+            data = text.encode('utf-8')
+            return list(_iter_json_array([data[i:i + size]
+                                          for i in range(0, len(data), size)],
+                                         key))
+
+        flows = json.dumps({'flowConfig': [self.odl_test_flow_1,
+                                           self.odl_test_flow_2]})
+        for size in (1, 3, 7, len(flows)):
+            self.assertEqual(parse(flows, 'flowConfig', size),
+                             [self.odl_test_flow_1, self.odl_test_flow_2])
+            self.assertEqual(parse('{"flowConfig":[1234,5]}', 'flowConfig',
+                                   size), [1234, 5])
+            self.assertEqual(parse('{"name":"flowConfig","flowConfig":'
+                                   '{"a":1.5e3}}', 'flowConfig', size),
+                             [{'a': 1500.0}])
+            self.assertEqual(parse('{"flowConfig":null}', 'flowConfig', size),
+                             [])
+            self.assertEqual(parse('{"nodeProperties":[]}', 'flowConfig',
+                                   size), [])
+
+    def test_05_analyze_flows(self):
+        """A higher priority flow matching all IPv4 makes both sample flows
+           redundant, and one with other actions would shadow them.
+        """
+        catchall = {u'actions': u'DROP',
+                    u'etherType': u'0x800',
+                    u'name': u'odl-test-catchall',
+                    u'node': {u'@id': self.switch_id_1, u'@type': u'OF'},
+                    u'priority': u'600'}
+        report = OpenDaylightFlowAnalyzer([self.odl_test_flow_1,
+                                           self.odl_test_flow_2,
+                                           catchall]).analyze()
+        self.assertEqual(sorted(r['flow_name'] for r in report['redundant']),
+                         [u'odl-test-flow1', u'odl-test-flow2'])
+        catchall[u'actions'] = u'CONTROLLER'
+        report = OpenDaylightFlowAnalyzer([self.odl_test_flow_1,
+                                           catchall]).analyze()
+        self.assertEqual(report['shadowed'],
+                         [{'node_id': self.switch_id_1,
+                           'flow_name': u'odl-test-flow1',
+                           'by': u'odl-test-catchall'}])
+
     def test_10_add_flow(self):
         """Add a sample flow onto the controller
         """
@@ -121,6 +297,23 @@ class TestSequenceFunctions(unittest.TestCase):
         else:
             self.fail('Expected Exception not thrown')
 
+    def test_15_validate_flows(self):
+        """Check a bad port, a non-existant switch and a non-hexadecimal
+           switch name locally, against the controller's inventory.
+        """
+        validator = OpenDaylightFlowValidator(self.node.get_inventory())
+        bad_port = dict(self.odl_test_flow_1, ingressPort=u'4242')
+        no_switch = dict(self.odl_test_flow_1,
+                         node={u'@id': u'99:99:99:00:00:00:42:00',
+                               u'@type': u'OF'})
+        bad_name = dict(self.odl_test_flow_1,
+                        node={u'@id': u'99:99:99:00:00:00:01:0g',
+                              u'@type': u'OF'})
+        good, bad = validator.validate_many([self.odl_test_flow_1, bad_port,
+                                             no_switch, bad_name])
+        self.assertEqual(good, [self.odl_test_flow_1])
+        self.assertEqual(len(bad), 3)
+
     def test_20_get_flow(self):
         """Retrieve the specific flow back from the controller
         """
@@ -135,6 +328,28 @@ class TestSequenceFunctions(unittest.TestCase):
         self.assertEqual(self.flow.flows, self.odl_test_flow_1)
         self.assertEqual(self.flow.request.status_code, 200)
 
+    def test_20_get_flow_cached(self):
+        """Retrieve the specific flow twice through a cache, which should
+           only ask the controller once.
+        """
+        cache = OpenDaylightFlowCache()
+        flow = OpenDaylightFlow(self.flow.odl, cache=cache)
+        flow.get(node_id=self.switch_id_1, flow_name='odl-test-flow1')
+        flow.get(node_id=self.switch_id_1, flow_name='odl-test-flow1')
+        self.assertEqual(flow.flows, self.odl_test_flow_1)
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_20_call_get_flow(self):
+        """Retrieve the specific flow through the stateless call API, which
+           should leave the OpenDaylightFlow alone.
+        """
+        result = self.flow.call_get(node_id=self.switch_id_1,
+                                    flow_name='odl-test-flow1')
+        self.assertEqual(result.data, self.odl_test_flow_1)
+        self.assertEqual(result.status, 200)
+        self.assertEqual(self.flow.flows, None)
+
 
     def test_30_get_all_switch_flows(self):
         """Retrieve all flows from this switch back from the controller
@@ -152,6 +367,40 @@ class TestSequenceFunctions(unittest.TestCase):
         self.assertTrue(self.odl_test_flow_2 in self.flow.flows)
         self.assertEqual(self.flow.request.status_code, 200)
 
+    def test_30_iter_all_flows(self):
+        """Stream all flows back from the controller
+        """
+        flows = list(self.flow.iter_flows())
+        self.assertTrue(self.odl_test_flow_1 in flows)
+        self.assertTrue(self.odl_test_flow_2 in flows)
+
+    def test_30_flow_table(self):
+        """Look up the sample flows in a table built from all flows
+        """
+        self.flow.get()
+        table = self.flow.table()
+        self.assertTrue(self.odl_test_flow_1 in table)
+        self.assertEqual(table.get(self.switch_id_1, 'odl-test-flow2'),
+                         self.odl_test_flow_2)
+        self.assertEqual(table.filter(node_id=self.switch_id_1,
+                                      ingressPort=1, priority=500),
+                         [self.odl_test_flow_1])
+
+    def test_30_dump_restore_flows(self):
+        """Dump this switch's flows to a snapshot, then restore it, which
+           should find every flow already there.
+        """
+        handle, path = tempfile.mkstemp(suffix='.gz')
+        os.close(handle)
+        try:
+            count = self.flow.dump(path, node_id=self.switch_id_1)
+            self.assertTrue(count >= 2)
+            summary = self.flow.restore(path)
+            self.assertEqual(summary['added'], 0)
+            self.assertEqual(summary['skipped'], count)
+        finally:
+            os.remove(path)
+
     def test_30_get_flows_invalid_switch(self):
         """Try to get a flow from a non-existant switch
         """
@@ -207,10 +456,108 @@ class TestSequenceFunctions(unittest.TestCase):
         self.assertEqual(self.flow.request.status_code, 200)
 
 
-    #TODO:  Add invalid flow that has a bad port 
-    #TODO:  Add invalid flow that has a non-existant switch 
-    #TODO:  Add invalid flow that has an invalid switch name (non-hexadecimal), 
-    #       see https://bugs.opendaylight.org/show_bug.cgi?id=27
+    def test_56_add_many_flows(self):
+        """Add both sample flows at once, plus a duplicate which should be
+           reported without stopping the others.
+        """
+        # one worker, so the duplicate is sure to go last
+        results = self.flow.add_many([self.odl_test_flow_1,
+                                      self.odl_test_flow_2,
+                                      self.odl_test_flow_1], max_workers=1)
+        self.assertEqual([r['http_code'] for r in results][:2], [201, 201])
+        self.assertEqual(results[0]['flow_name'], 'odl-test-flow1')
+        self.assertTrue(results[2]['error'] is not None)
+
+    def test_57_delete_many_flows(self):
+        """Delete both sample flows at once.
+        """
+        results = self.flow.delete_many(
+                    [(self.switch_id_1, self.odl_test_flow_1['name']),
+                     (self.switch_id_1, self.odl_test_flow_2['name'])])
+        self.assertEqual([r['http_code'] for r in results], [200, 200])
+        self.assertEqual([r['error'] for r in results], [None, None])
+
+    def test_57_flow_queue(self):
+        """Queue adding and deleting the sample flows, which should cancel
+           out without anything being sent, then add them and delete them
+           again for real.
+        """
+        queue = OpenDaylightFlowQueue(self.flow, delay=5)
+        added = queue.add(self.odl_test_flow_1)
+        deleted = queue.delete(self.switch_id_1, 'odl-test-flow1')
+        self.assertEqual(added.result(timeout=1)['http_code'], None)
+        self.assertEqual(deleted.result(timeout=1)['error'], None)
+        added = [queue.add(self.odl_test_flow_1),
+                 queue.add(self.odl_test_flow_2)]
+        self.assertTrue(queue.flush(timeout=10))
+        self.assertEqual([future.result()['http_code'] for future in added],
+                         [201, 201])
+        deleted = [queue.delete(self.switch_id_1, 'odl-test-flow1'),
+                   queue.delete(self.switch_id_1, 'odl-test-flow2')]
+        queue.close()
+        self.assertEqual([future.result()['http_code'] for future in deleted],
+                         [200, 200])
+
+    def test_57_flow_queue_workers(self):
+        """A queue's workers share out what is due, so sending 8 changes
+           to a slow Controller with 4 workers takes about 2 round trips,
+           not 8.
+        """
+        controller = self.stand_in(latency=0.05)
+        odl = controller.odl()
+        queue = OpenDaylightFlowQueue(OpenDaylightFlow(odl), max_workers=4,
+                                      delay=1)
+        flows = [dict(self.odl_test_flow_1, name='odl-queue-flow%d' % i)
+                 for i in range(8)]
+        added = [queue.add(flow) for flow in flows]
+        start = time.time()
+        self.assertTrue(queue.flush(timeout=10))
+        self.assertTrue(time.time() - start < 0.3)
+        self.assertEqual([future.result()['http_code'] for future in added],
+                         [201] * 8)
+        queue.close()
+        odl.close()
+
+    def test_57_flow_queue_in_flight(self):
+        """An add then a delete don't cancel out while an earlier add of
+           the same flow is still being sent: the flow is deleted after it.
+        """
+        controller = self.stand_in(latency=0.2)
+        odl = controller.odl()
+        queue = OpenDaylightFlowQueue(OpenDaylightFlow(odl))
+        first = queue.add(self.odl_test_flow_1)
+        while not queue._in_flight:
+            time.sleep(0.01)
+        second = queue.add(self.odl_test_flow_1)
+        deleted = queue.delete(self.switch_id_1, 'odl-test-flow1')
+        self.assertTrue(queue.flush(timeout=10))
+        self.assertEqual(first.result()['http_code'], 201)
+        self.assertEqual(second.result()['http_code'], 200)
+        self.assertEqual(deleted.result()['http_code'], 200)
+        self.assertEqual(controller.flows[self.switch_id_1], {})
+        queue.close()
+        odl.close()
+
+    def test_58_sync_flows(self):
+        """Sync the sample flows onto the switch, then check a second
+           sync has nothing left to do.
+        """
+        desired = [self.odl_test_flow_1, self.odl_test_flow_2]
+        plan = self.flow.sync(desired, node_id=self.switch_id_1)
+        self.assertEqual(plan['add'], desired)
+        self.assertEqual([r['error'] for r in plan['results']], [None, None])
+        plan = self.flow.sync(desired, node_id=self.switch_id_1,
+                              dry_run=True)
+        self.assertEqual((plan['add'], plan['replace'], plan['delete']),
+                         ([], [], []))
+
+    def test_59_sync_no_flows(self):
+        """Sync nothing onto the switch, which should delete the sample
+           flows again.
+        """
+        plan = self.flow.sync([], node_id=self.switch_id_1)
+        self.assertTrue((self.switch_id_1, 'odl-test-flow1') in plan['delete'])
+        self.assertTrue((self.switch_id_1, 'odl-test-flow2') in plan['delete'])
 
     def test_60_get_all_nodes(self):
         """Get all of the nodes on the controller
@@ -220,6 +567,13 @@ class TestSequenceFunctions(unittest.TestCase):
         self.node.get_nodes()
         self.assertEqual(self.node.request.status_code, 200)
 
+    def test_60_iter_all_nodes(self):
+        """Stream all of the nodes on the controller, which should include
+           SWITCH_1
+        """
+        ids = [n['node']['@id'] for n in self.node.iter_nodes()]
+        self.assertTrue(SWITCH_1 in ids)
+
     def test_60_get_node_connector(self):
         """Retrieve a list of all the node connectors and their properties 
            in a given node 
@@ -230,6 +584,14 @@ class TestSequenceFunctions(unittest.TestCase):
         self.assertEqual(self.node.request.status_code, 200)
 
 
+    def test_60_get_inventory(self):
+        """Crawl every node and its connectors, which should include
+           SWITCH_1
+        """
+        inventory = self.node.get_inventory()
+        self.assertTrue(SWITCH_1 in inventory['connectors'])
+        self.assertEqual(inventory['errors'], {})
+
     def test_60_get_bad_node_connector(self):
         """Retrieve a list of all the node connectors and their properties 
            in a given node for a node that does not exist
@@ -244,6 +606,135 @@ class TestSequenceFunctions(unittest.TestCase):
             self.fail('Expected Exception not thrown')
 
 
+    def test_60_get_port_statistics(self):
+        """Get the port counters of SWITCH_1, which should include a
+           'receiveBytes' for each port
+        """
+        statistics = OpenDaylightStatistics(self.node.odl)
+        statistics.get_port_statistics(SWITCH_1)
+        self.assertEqual(statistics.request.status_code, 200)
+        for port in statistics.port_statistics:
+            self.assertTrue('receiveBytes' in port)
+
+    def test_60_port_sampler(self):
+        """Sample every port twice, after which each of SWITCH_1's ports
+           that is up should have a rate
+        """
+        sampler = OpenDaylightPortSampler(self.node.odl, size=4)
+        self.assertTrue(sampler.sample() > 0)
+        time.sleep(1)
+        sampler.sample()
+        rates = sampler.rates('receivePackets')
+        ports = [port for port in rates if port[0] == SWITCH_1]
+        self.assertTrue(ports)
+        self.assertTrue(rates[ports[0]] >= 0)
+        self.assertEqual(len(sampler.series(ports[0][0], ports[0][1])), 2)
+        percentiles = sampler.percentiles('receivePackets', (50, 99))
+        self.assertTrue(percentiles[50] <= percentiles[99])
+
+    def test_60_poller(self):
+        """Each poll reports just the Nodes, NodeConnectors and flows that
+           were added, changed or removed since the one before, and a Node
+           whose connectors can't be fetched doesn't lose them.
+        """
+        switch_2 = '99:99:99:00:00:00:02:00'
+        controller = self.stand_in(nodes={SWITCH_1: [1, 2]})
+        odl = controller.odl()
+        poller = OpenDaylightPoller(odl)
+        reported = []
+        poller.register(reported.append)
+
+        def keys(changes, kind, what):
+            """Sorted keys of what changed, whatever form they take."""
+            found = []
+            for entity in changes[kind][what]:
+                if what == 'removed':
+                    found.append(entity)
+                elif kind == 'nodes':
+                    found.append(entity['node']['@id'])
+                elif kind == 'connectors':
+                    connector = entity['nodeconnector']
+                    found.append((connector['node']['@id'], connector['@id']))
+                else:
+                    found.append((entity['node']['@id'], entity['name']))
+            return sorted(found)
+
+        changes = poller.poll()
+        self.assertEqual(reported, [changes])
+        self.assertEqual(keys(changes, 'nodes', 'added'), [SWITCH_1])
+        self.assertEqual(keys(changes, 'connectors', 'added'),
+                         [(SWITCH_1, '1'), (SWITCH_1, '2')])
+        self.assertEqual(changes['flows'],
+                         {'added':[], 'changed':[], 'removed':[]})
+        self.assertEqual(poller.poll(), None)
+        self.assertEqual(len(reported), 1)
+
+        with controller.lock:
+            controller.nodes[SWITCH_1].append(3)
+            controller.nodes[switch_2] = [1]
+            controller.flows[SWITCH_1] = {'odl-test-flow1':
+                                          dict(self.odl_test_flow_1)}
+        changes = poller.poll()
+        self.assertEqual(keys(changes, 'nodes', 'added'), [switch_2])
+        self.assertEqual(keys(changes, 'connectors', 'added'),
+                         [(SWITCH_1, '3'), (switch_2, '1')])
+        self.assertEqual(keys(changes, 'flows', 'added'),
+                         [(SWITCH_1, 'odl-test-flow1')])
+
+        with controller.lock:
+            controller.nodes[SWITCH_1].remove(1)
+            del controller.nodes[switch_2]
+            controller.flows[SWITCH_1]['odl-test-flow1']['priority'] = '600'
+        changes = poller.poll()
+        self.assertEqual(keys(changes, 'nodes', 'added'), [])
+        self.assertEqual(keys(changes, 'nodes', 'removed'), [switch_2])
+        self.assertEqual(keys(changes, 'connectors', 'removed'),
+                         [(SWITCH_1, '1'), (switch_2, '1')])
+        self.assertEqual(keys(changes, 'flows', 'changed'),
+                         [(SWITCH_1, 'odl-test-flow1')])
+        self.assertEqual(len(reported), 3)
+
+        # the nodes answer as usual, then SWITCH_1's connectors fail
+        controller.faults.extend([(0, None), (0, 500)])
+        self.assertEqual(poller.poll(), None)
+        with controller.lock:
+            controller.nodes[SWITCH_1].remove(2)
+        changes = poller.poll()
+        self.assertEqual(keys(changes, 'connectors', 'removed'),
+                         [(SWITCH_1, '2')])
+        odl.close()
+
+    def test_60_poller_interval(self):
+        """Polling in the background halves the interval after a poll that
+           found changes and grows it by half after one that didn't or
+           failed, between min_interval and max_interval.
+        """
+        poller = OpenDaylightPoller(OpenDaylight(), min_interval=0.001,
+                                    max_interval=0.01)
+        outcomes = [{}, None, None, None, None, None, None, {},
+                    OpenDaylightError({'url':None, 'http_code':None,
+                                       'msg':'down'})]
+        intervals = []
+
+        def poll():
+            intervals.append(poller.interval)
+            outcome = outcomes.pop(0)
+            if not outcomes:
+                poller._stop.set()
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        poller.poll = poll
+        poller._run()
+        expected = [0.001, 0.001, 0.0015, 0.00225, 0.003375, 0.0050625,
+                    0.00759375, 0.01, 0.005]
+        self.assertEqual(len(intervals), len(expected))
+        for interval, value in zip(intervals, expected):
+            self.assertAlmostEqual(interval, value)
+        self.assertAlmostEqual(poller.interval, 0.0075)
+        self.assertTrue(isinstance(poller.last_error, OpenDaylightError))
+
     def test_60_save(self):
         """Save the switch configurations.  
             It's not clear that this can be easily tested, so we just
@@ -252,6 +743,479 @@ class TestSequenceFunctions(unittest.TestCase):
         self.node.save()
         self.assertEqual(self.node.request.status_code, 200)
 
+    def test_70_connection_reuse(self):
+        """Make sure back to back calls share one pooled connection.
+        """
+        self.node.get_nodes()
+        self.flow.get()
+        stats = self.node.odl.pool_stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+        self.node.odl.close()
+        self.assertEqual(self.node.odl.pool_stats()['requests'], 0)
+
+    def test_70_limiter(self):
+        """Push the sample flows through an adaptive limiter, which should
+           have nothing left in flight afterwards.
+        """
+        limiter = OpenDaylightLimiter()
+        self.flow.odl.limiter = limiter
+        results = self.flow.add_many([self.odl_test_flow_1,
+                                      self.odl_test_flow_2], max_workers=8)
+        self.assertEqual(len(results), 2)
+        stats = limiter.stats()
+        self.assertEqual(stats['in_flight'], 0)
+        self.assertEqual(stats['waiting'], 0)
+        self.assertTrue(stats['limit'] >= 1)
+        # the starting cap doesn't exceed the most asked for, as with
+        # odl --adaptive -j2
+        self.assertEqual(OpenDaylightLimiter(max_limit=2).limit, 2)
+
+    def test_70_coalesce_reads(self):
+        """Get this switch's flows from many threads at once, with identical
+           reads coalesced; every thread should see the same flows, and
+           every call should have been sent or merged.
+        """
+        odl = self.flow.odl
+        self.add_test_flows()
+        odl.setup['coalesce_reads'] = True
+        odl.setup['pool_size'] = 16
+        odl.close()
+        results = []
+
+        def worker():
+            flow = OpenDaylightFlow(odl)
+            results.append(flow.call_get(node_id=self.switch_id_1).data)
+
+        try:
+            threads = [threading.Thread(target=worker) for _ in range(16)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(len(results), 16)
+            self.assertTrue(self.odl_test_flow_1 in results[0])
+            self.assertTrue(all(result == results[0] for result in results))
+            self.assertEqual(odl.pool_stats()['requests'] + odl.coalesced,
+                             16)
+        finally:
+            self.remove_test_flows()
+            odl.close()
+
+    def test_70_stdlib_transport(self):
+        """Retrieve the sample flows and reuse the connection with the
+           http.client transport.
+        """
+        self.flow.odl.setup['transport'] = 'http.client'
+        self.add_test_flows()
+        try:
+            self.flow.odl.close()
+            self.flow.get(node_id=self.switch_id_1)
+            self.assertTrue(self.odl_test_flow_1 in self.flow.flows)
+            self.node.get_nodes()
+            self.assertEqual(self.flow.odl.pool_stats()['hits'], 1)
+        finally:
+            self.remove_test_flows()
+            self.flow.odl.close()
+
+
+    def test_70_instrumentation(self):
+        """Calls are counted and timed by application and operation, and
+           hooks see each one, but only while instrumentation is on.
+        """
+        controller = self.stand_in()
+        for transport in ('requests', 'http.client'):
+            odl = controller.odl(transport)
+            node = OpenDaylightNode(odl)
+            flow = OpenDaylightFlow(odl)
+            instrumentation = OpenDaylightInstrumentation()
+            seen = []
+
+            def trace(app, op, method, url, kwargs):
+                kwargs.setdefault('headers', {})['X-Trace'] = op
+
+            def record(app, op, method, url, response, latency, error):
+                seen.append((app, op, response is not None, error is None))
+
+            instrumentation.pre_hooks.append(trace)
+            instrumentation.post_hooks.append(record)
+
+            # off: nothing is recorded and the hooks are left alone
+            node.get_nodes()
+            self.assertEqual(instrumentation.snapshot(), {})
+            self.assertEqual(seen, [])
+            self.assertTrue('X-Trace' not in controller.last_headers)
+
+            odl.instrumentation = instrumentation
+            node.get_nodes()
+            self.assertEqual(controller.last_headers['X-Trace'], 'get_nodes')
+            controller.latency = 0.03
+            node.get_nodes()
+            controller.latency = 0.0
+            node.get_nodes()
+            flow.add(self.odl_test_flow_1)
+            self.assertRaises(OpenDaylightError, flow.get,
+                              self.switch_id_1, 'no-such-flow')
+            flow.delete(self.switch_id_1, self.odl_test_flow_1['name'])
+
+            snapshot = instrumentation.snapshot()
+            stats = snapshot['switch']['get_nodes']
+            self.assertEqual(stats['calls'], 3)
+            self.assertEqual(stats['status'], {200: 3})
+            self.assertTrue(stats['bytes_received'] > 0)
+            self.assertTrue(stats['latency_sum'] >= 0.03)
+            self.assertEqual(sum(stats['latency_buckets']), 3)
+            self.assertEqual(snapshot['flow']['add']['status'], {201: 1})
+            self.assertEqual(snapshot['flow']['add']['bytes_sent'],
+                             len(json.dumps(self.odl_test_flow_1)))
+            self.assertEqual(snapshot['flow']['get']['status'], {404: 1})
+            self.assertEqual(snapshot['flow']['delete']['status'], {200: 1})
+            self.assertEqual(seen, [('switch', 'get_nodes', True, True)] * 3 +
+                                   [('flow', 'add', True, True),
+                                    ('flow', 'get', True, True),
+                                    ('flow', 'delete', True, True)])
+
+            text = instrumentation.prometheus()
+            self.assertTrue('opendaylight_requests_total{app="switch",'
+                            'op="get_nodes",code="200"} 3\n' in text)
+            prefix = ('opendaylight_request_duration_seconds_bucket'
+                      '{app="switch",op="get_nodes",le="')
+            counts = [int(line.split()[-1]) for line in text.splitlines()
+                      if line.startswith(prefix)]
+            # one per bucket, cumulative, and ending with le="+Inf"
+            self.assertEqual(len(counts), len(instrumentation.buckets) + 1)
+            total = 0
+            for count, bucket in zip(counts, stats['latency_buckets']):
+                total += bucket
+                self.assertEqual(count, total)
+            self.assertTrue(prefix + '+Inf"} 3\n' in text)
+            self.assertTrue('opendaylight_request_duration_seconds_count'
+                            '{app="switch",op="get_nodes"} 3\n' in text)
+            # the slow call is beyond the 25ms bucket
+            self.assertTrue(counts[instrumentation.buckets.index(0.025)] < 3)
+
+            instrumentation.reset()
+            self.assertEqual(instrumentation.snapshot(), {})
+            odl.close()
+
+    def test_70_cli(self):
+        """Add, get and delete the sample flows with the odl command, as
+           json lines, and have a line that isn't json make it fail.
+        """
+        controller = self.stand_in()
+        here = os.path.dirname(os.path.abspath(__file__))
+
+        def odl(args, lines=()):
+            """Run odl, returning its exit status, stdout lines and
+               stderr."""
+            process = subprocess.Popen(
+                [sys.executable, os.path.join(here, 'odl'),
+                 '--hostname', controller.server_address[0],
+                 '--port', str(controller.server_address[1])] + args,
+                cwd=here, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE, universal_newlines=True)
+            out, err = process.communicate(''.join(line + '\n'
+                                                   for line in lines))
+            return (process.returncode,
+                    [json.loads(line) for line in out.splitlines()], err)
+
+        flows = [self.odl_test_flow_1, self.odl_test_flow_2]
+        status, added, err = odl(['add'], [json.dumps(f) for f in flows])
+        self.assertEqual(status, 0)
+        self.assertEqual(sorted((r['flow_name'], r['http_code'])
+                                for r in added),
+                         [('odl-test-flow1', 201), ('odl-test-flow2', 201)])
+        self.assertTrue(err.startswith('add: 2 done, 0 failed'))
+
+        status, got, err = odl(['get', SWITCH_1])
+        self.assertEqual(status, 0)
+        self.assertEqual(sorted(got, key=lambda f: f['name']), flows)
+        status, got, err = odl(['get', SWITCH_1, 'odl-test-flow1'])
+        self.assertEqual((status, got), (0, [self.odl_test_flow_1]))
+
+        # delete takes add's results as well as flowConfigs
+        status, deleted, err = odl(['delete'],
+                                   [json.dumps(r) for r in added])
+        self.assertEqual(status, 0)
+        self.assertEqual([r['http_code'] for r in deleted], [200, 200])
+        self.assertEqual(controller.flows[SWITCH_1], {})
+
+        status, added, err = odl(['add'], [json.dumps(flows[0]), '{"name":',
+                                           json.dumps(flows[1])])
+        self.assertEqual(status, 1)
+        self.assertEqual([r['http_code'] for r in added], [201, 201])
+        self.assertTrue('<stdin>:2: ' in err)
+        self.assertTrue('add: 3 done, 1 failed' in err)
+
+        status, got, err = odl(['get', SWITCH_1, 'no-such-flow'])
+        self.assertEqual((status, got), (1, []))
+
+    @unittest.skipIf(aiohttp is None, 'aiohttp is not installed')
+    def test_70_async_client(self):
+        """Add, get and delete the sample flow and list nodes and
+           connectors with the asyncio client, which raises
+           OpenDaylightError for a flow that isn't there.
+        """
+        import asyncio
+        from OpenDaylightAsync import (AsyncOpenDaylight,
+                                       AsyncOpenDaylightFlow,
+                                       AsyncOpenDaylightNode)
+        controller = self.stand_in(nodes={SWITCH_1: [1, 2]})
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+        aodl = AsyncOpenDaylight(controller.odl())
+        flow = AsyncOpenDaylightFlow(aodl)
+        node = AsyncOpenDaylightNode(aodl)
+        run = loop.run_until_complete
+        try:
+            run(flow.add(self.odl_test_flow_1))
+            self.assertEqual(run(flow.get(SWITCH_1, 'odl-test-flow1')),
+                             self.odl_test_flow_1)
+            self.assertEqual(run(flow.get(SWITCH_1)), [self.odl_test_flow_1])
+            self.assertEqual(run(flow.get()), [self.odl_test_flow_1])
+            self.assertEqual([n['node']['@id'] for n in run(node.get_nodes())],
+                             [SWITCH_1])
+            connectors = run(node.get_node_connectors(SWITCH_1))
+            self.assertEqual([c['nodeconnector']['@id'] for c in connectors],
+                             ['1', '2'])
+            run(node.save())
+            run(flow.delete(SWITCH_1, 'odl-test-flow1'))
+            self.assertEqual(controller.flows[SWITCH_1], {})
+            try:
+                run(flow.get(SWITCH_1, 'odl-test-flow1'))
+            except OpenDaylightError as err:
+                self.assertEqual(err.args[0]['http_code'], 404)
+            else:
+                self.fail('getting a deleted flow did not raise')
+            self.assertRaises(OpenDaylightError, run,
+                              flow.delete(SWITCH_1, 'odl-test-flow1'))
+        finally:
+            run(aodl.close())
+
+    def test_80_post_never_retried(self):
+        """A POST that gets a 503, or whose connection drops before any
+           answer, is not sent again, whatever setup['retries'] says.
+        """
+        controller = self.stand_in()
+        for transport in ('requests', 'http.client'):
+            odl = controller.odl(transport)
+            odl.setup['retries'] = 3
+            odl.setup['retry_backoff'] = 0
+            node = OpenDaylightNode(odl)
+            for status in (503, 'drop'):
+                node.get_nodes()
+                controller.hits.clear()
+                controller.faults.extend([(0, status)] * 4)
+                self.assertRaises((OpenDaylightError,) +
+                                  odl.transport.errors, node.save)
+                self.assertEqual(controller.hits, {'POST': 1})
+                controller.faults.clear()
+            odl.close()
+
+    def test_80_delete_resent_only_by_retries(self):
+        """A DELETE whose kept-alive connection drops before any answer is
+           sent again only if setup['retries'] allows, on either transport.
+        """
+        controller = self.stand_in()
+        for transport in ('requests', 'http.client'):
+            odl = controller.odl(transport)
+            odl.setup['retry_backoff'] = 0
+            flow = OpenDaylightFlow(odl)
+            flow.add(self.odl_test_flow_1)
+            controller.hits.clear()
+            controller.faults.append((0, 'drop'))
+            self.assertRaises((OpenDaylightError,) + odl.transport.errors,
+                              flow.delete, self.switch_id_1, 'odl-test-flow1')
+            self.assertEqual(controller.hits, {'DELETE': 1})
+
+            odl.setup['retries'] = 1
+            controller.hits.clear()
+            controller.faults.append((0, 'drop'))
+            flow.delete(self.switch_id_1, 'odl-test-flow1')
+            self.assertEqual(controller.hits, {'DELETE': 2})
+            odl.close()
+
+    def test_80_retry_with_jitter(self):
+        """A GET that gets 503s is retried after random pauses of up to
+           retry_backoff, doubled for each earlier attempt.
+        """
+        controller = self.stand_in()
+        odl = controller.odl()
+        odl.setup['retries'] = 3
+        odl.setup['retry_backoff'] = 0.01
+        controller.faults.extend([(0, 503), (0, 503)])
+        pauses = []
+        uniform = random.uniform
+
+        def recording_uniform(low, high):
+            pauses.append((low, high))
+            return uniform(low, high)
+
+        random.uniform = recording_uniform
+        try:
+            result = OpenDaylightNode(odl).call_get_nodes()
+        finally:
+            random.uniform = uniform
+        self.assertEqual(result.status, 200)
+        self.assertEqual(controller.hits, {'GET': 3})
+        self.assertEqual(pauses, [(0, 0.01), (0, 0.02)])
+
+        # but not more times than it is allowed
+        controller.hits.clear()
+        controller.faults.extend([(0, 503)] * 5)
+        self.assertRaises(OpenDaylightError,
+                          OpenDaylightNode(odl).call_get_nodes)
+        self.assertEqual(controller.hits, {'GET': 4})
+        odl.close()
+
+    def test_80_deadline(self):
+        """setup['timeout'] bounds a whole call, waiting and retrying
+           included.
+        """
+        controller = self.stand_in()
+        odl = controller.odl()
+        odl.setup['timeout'] = 0.2
+        node = OpenDaylightNode(odl)
+        controller.faults.append((1.0, None))
+        start = time.time()
+        self.assertRaises(odl.transport.Timeout, node.call_get_nodes)
+        self.assertTrue(time.time() - start < 0.6)
+
+        odl.setup['retries'] = 100
+        odl.setup['retry_backoff'] = 1.0
+        controller.faults.extend([(0, 503)] * 100)
+        start = time.time()
+        self.assertRaises(odl.transport.Timeout, node.call_get_nodes)
+        self.assertTrue(time.time() - start < 0.6)
+        controller.faults.clear()
+        odl.close()
+
+    def test_80_hedge_slow_get(self):
+        """A GET much slower than the ones before it is hedged, and the
+           hedge's answer comes back without waiting for the first.
+        """
+        controller = self.stand_in(latency=0.005)
+        for transport in ('requests', 'http.client'):
+            odl = controller.odl(transport)
+            odl.setup['hedge_percentile'] = 95
+            node = OpenDaylightNode(odl)
+            for _ in range(30):
+                node.call_get_nodes()
+            controller.hits.clear()
+            controller.faults.append((2.0, None))
+            start = time.time()
+            self.assertEqual(node.call_get_nodes().status, 200)
+            self.assertTrue(time.time() - start < 1.0)
+            self.assertEqual(controller.hits, {'GET': 2})
+            odl.close()
+
+    def test_80_hedge_budget(self):
+        """Many more callers than pooled connections don't set off a storm
+           of hedges: no more than setup['hedge_budget'] of GETs are
+           duplicated.
+        """
+        controller = self.stand_in(latency=0.01)
+        odl = controller.odl()
+        odl.setup['hedge_percentile'] = 95
+        node = OpenDaylightNode(odl)
+
+        def worker():
+            for _ in range(20):
+                node.call_get_nodes()
+
+        threads = [threading.Thread(target=worker) for _ in range(32)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(controller.hits['GET'] <= 640 * 1.1)
+        odl.close()
+
+    def test_90_cluster_ring(self):
+        """Every client places a switch on the same Controller, and marking
+           one down moves only its switches, spread over the rest.
+        """
+        setups = [{'hostname':'10.10.10.%d' % i} for i in range(1, 4)]
+        cluster = OpenDaylightCluster(setups)
+        switches = ['99:99:99:00:00:00:%02x:%02x' % (i // 256, i % 256)
+                    for i in range(300)]
+        owners = dict((switch, cluster.controller_for(switch))
+                      for switch in switches)
+        self.assertEqual(set(owners.values()), set(cluster.controllers))
+        other = OpenDaylightCluster(setups)
+        for switch in switches:
+            self.assertEqual(other.controller_for(switch).setup['hostname'],
+                             owners[switch].setup['hostname'])
+
+        down = cluster.controllers[0]
+        cluster.mark_down(down)
+        self.assertEqual(cluster.live(), cluster.controllers[1:])
+        moved = set()
+        for switch in switches:
+            odl = cluster.controller_for(switch)
+            if owners[switch] is down:
+                moved.add(odl)
+            else:
+                self.assertTrue(odl is owners[switch])
+        self.assertEqual(moved, set(cluster.controllers[1:]))
+
+        cluster.mark_up(down)
+        for switch in switches:
+            self.assertTrue(cluster.controller_for(switch) is owners[switch])
+
+        for odl in cluster.controllers:
+            cluster.mark_down(odl)
+        self.assertRaises(OpenDaylightError, cluster.controller_for,
+                          switches[0])
+
+    def test_90_cluster_add_many(self):
+        """Each flow is added on the Controller that owns its switch, and
+           nowhere else.
+        """
+        switches = ['99:99:99:00:00:00:02:%02x' % i for i in range(16)]
+        nodes = dict((switch, [1]) for switch in switches)
+        controllers, cluster = self.cluster_of_stand_ins([nodes, dict(nodes)])
+        flows = [dict(self.odl_test_flow_1, name='odl-cluster-flow%d' % i,
+                      node={'@id':switch, '@type':'OF'})
+                 for i, switch in enumerate(switches)]
+        results = OpenDaylightClusterFlow(cluster).add_many(flows)
+        self.assertEqual([r['http_code'] for r in results], [201] * 16)
+        for flow in flows:
+            switch = flow['node']['@id']
+            owner = cluster.controllers.index(cluster.controller_for(switch))
+            for i, controller in enumerate(controllers):
+                self.assertEqual(flow['name'] in controller.flows.get(switch,
+                                                                      {}),
+                                 i == owner)
+        # both stand-ins should have had some of the switches
+        self.assertTrue(all(controller.flows for controller in controllers))
+
+        # and a controller-wide get() finds all of them
+        cluster_flow = OpenDaylightClusterFlow(cluster)
+        cluster_flow.get()
+        self.assertEqual(sorted(f['name'] for f in cluster_flow.flows),
+                         sorted(f['name'] for f in flows))
+
+    def test_90_cluster_get_nodes(self):
+        """Switches known to more than one Controller are listed once.
+        """
+        shared = {SWITCH_1: [1], '99:99:99:00:00:00:03:00': [1]}
+        first = dict(shared)
+        first['99:99:99:00:00:00:03:01'] = [1]
+        second = dict(shared)
+        second['99:99:99:00:00:00:03:02'] = [1]
+        controllers, cluster = self.cluster_of_stand_ins([first, second])
+        node = OpenDaylightClusterNode(cluster)
+        node.get_nodes()
+        ids = [n['node']['@id'] for n in node.nodes]
+        self.assertEqual(sorted(ids), sorted(set(first) | set(second)))
+
+        # with one down, only what the other knows
+        cluster.mark_down(cluster.controllers[1])
+        node.get_nodes()
+        self.assertEqual(sorted(n['node']['@id'] for n in node.nodes),
+                         sorted(first))
+
 
 class SingleSwitchTopo(Topo):
     "Single switch connected to n hosts."